@@ -0,0 +1,79 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Cython versions of the planner's scalar geometry helpers.
+
+Optional: build with `python setup.py build_ext --inplace`. When the compiled
+module is missing, trajectory_planner uses its pure-Python implementations.
+"""
+from libc.math cimport sqrt
+
+
+cpdef double point_to_seg_dist2(double sx, double sy, double sz,
+                                double gx, double gy, double gz,
+                                double px, double py, double pz) nogil:
+    """Squared distance from point p to the segment s-g"""
+    cdef double lx = gx - sx
+    cdef double ly = gy - sy
+    cdef double lz = gz - sz
+    cdef double vx = px - sx
+    cdef double vy = py - sy
+    cdef double vz = pz - sz
+    cdef double line_length_sq = lx * lx + ly * ly + lz * lz
+    cdef double t = 0.0
+
+    if line_length_sq > 0.0:
+        t = (vx * lx + vy * ly + vz * lz) / line_length_sq
+        if t < 0.0:
+            t = 0.0
+        elif t > 1.0:
+            t = 1.0
+
+    vx -= t * lx
+    vy -= t * ly
+    vz -= t * lz
+    return vx * vx + vy * vy + vz * vz
+
+
+cpdef tuple detour_midpoint(double sx, double sy, double sz,
+                            double gx, double gy, double gz,
+                            double ox, double oy, double oz,
+                            double detour_distance):
+    """Detour midpoint around obstacle o, offset perpendicular to the segment s-g"""
+    cdef double lx = gx - sx
+    cdef double ly = gy - sy
+    cdef double lz = gz - sz
+    cdef double line_length_sq = lx * lx + ly * ly + lz * lz
+    cdef double t, qx, qy, qz, fx, fy, fz, nx, ny, nz, n
+
+    if line_length_sq == 0.0:
+        # Goal is at start position
+        return (sx, sy, sz)
+
+    t = ((ox - sx) * lx + (oy - sy) * ly + (oz - sz) * lz) / line_length_sq
+    if t < 0.0:
+        t = 0.0
+    elif t > 1.0:
+        t = 1.0
+
+    # Projected point on the segment and offset to the obstacle
+    qx = sx + t * lx
+    qy = sy + t * ly
+    qz = sz + t * lz
+    fx = ox - qx
+    fy = oy - qy
+    fz = oz - qz
+
+    # Perpendicular direction
+    nx = ly * fz - lz * fy
+    ny = lz * fx - lx * fz
+    nz = lx * fy - ly * fx
+    n = sqrt(nx * nx + ny * ny + nz * nz)
+
+    if n == 0.0:
+        # Vectors are parallel, use arbitrary perpendicular
+        nx, ny, nz = (0.0, 0.0, 1.0) if lz == 0.0 else (1.0, 0.0, 0.0)
+        n = 1.0
+
+    return (qx + detour_distance * nx / n,
+            qy + detour_distance * ny / n,
+            qz + detour_distance * nz / n)
@@ -0,0 +1,212 @@
+"""
+Compiled geometry kernels for the trajectory planner.
+
+The kernels are JIT-compiled with Numba when it is installed. Without Numba
+seg_dists_sq falls back to a plain NumPy implementation, so callers never
+need to know which version they got. detour_path, the whole detour search,
+only exists compiled and is None otherwise.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+    @njit(fastmath=True)
+    def seg_dists_sq(sx, sy, sz, gx, gy, gz, obs):
+        """Squared distance from each row of obs (N, 3) to the segment s-g"""
+        n = obs.shape[0]
+        out = np.empty(n, dtype=np.float64)
+
+        lx = gx - sx
+        ly = gy - sy
+        lz = gz - sz
+        line_length_sq = lx * lx + ly * ly + lz * lz
+
+        for i in range(n):
+            px = obs[i, 0] - sx
+            py = obs[i, 1] - sy
+            pz = obs[i, 2] - sz
+
+            t = 0.0
+            if line_length_sq > 0.0:
+                t = (px * lx + py * ly + pz * lz) / line_length_sq
+                t = min(1.0, max(0.0, t))
+
+            dx = px - t * lx
+            dy = py - t * ly
+            dz = pz - t * lz
+            out[i] = dx * dx + dy * dy + dz * dz
+
+        return out
+
+    @njit
+    def _closest_obstacle(s, g, obs):
+        """Smallest squared distance from obs to the segment s-g, and its first index"""
+        d2 = seg_dists_sq(s[0], s[1], s[2], g[0], g[1], g[2], obs)
+        best = 0
+        for i in range(1, d2.shape[0]):
+            if d2[i] < d2[best]:
+                best = i
+        return d2[best], best
+
+    @njit
+    def _detour_midpoint(s, g, o, detour_distance):
+        """Point detour_distance from s-g, perpendicular to it and away from o"""
+        lx = g[0] - s[0]
+        ly = g[1] - s[1]
+        lz = g[2] - s[2]
+        line_length_sq = lx * lx + ly * ly + lz * lz
+        out = s.copy()
+        if line_length_sq == 0:
+            # Goal is at start position
+            return out
+
+        t = ((o[0] - s[0]) * lx + (o[1] - s[1]) * ly + (o[2] - s[2]) * lz) / line_length_sq
+        t = min(1.0, max(0.0, t))
+
+        # Projected point on the segment and offset to the obstacle
+        qx = s[0] + t * lx
+        qy = s[1] + t * ly
+        qz = s[2] + t * lz
+        fx = o[0] - qx
+        fy = o[1] - qy
+        fz = o[2] - qz
+
+        # Perpendicular direction
+        nx = ly * fz - lz * fy
+        ny = lz * fx - lx * fz
+        nz = lx * fy - ly * fx
+        n = np.sqrt(nx * nx + ny * ny + nz * nz)
+        if n == 0:
+            # Vectors are parallel, use arbitrary perpendicular
+            nx, ny, nz = (0.0, 0.0, 1.0) if lz == 0 else (1.0, 0.0, 0.0)
+            n = 1.0
+
+        scale = detour_distance / n
+        out[0] = qx + nx * scale
+        out[1] = qy + ny * scale
+        out[2] = qz + nz * scale
+        return out
+
+    @njit
+    def detour_path(start, goal, obs, r2, detour_distance, max_depth):
+        """
+        Waypoints (K, 3) from start to goal routed around obs.
+
+        Compiled version of SimpleCollisionAvoidance's straight-line check
+        plus _find_detour_path for the linear-scan case; keep the two in step.
+        The depth limit bounds the search tree, so every buffer is a fixed
+        size array.
+        """
+        max_leaves = 2 ** max_depth
+        waypoints = np.empty((max_leaves + 1, 3))
+        waypoints[0] = start
+        count = 1
+
+        if _closest_obstacle(start, goal, obs)[0] >= r2:
+            waypoints[1] = goal
+            return waypoints[:2]
+
+        # Midpoints already proposed, rounded to the millimetre
+        visited = np.empty((max_leaves, 3))
+        n_visited = 0
+
+        # Depth-first stack of segments still to route
+        stack_start = np.empty((max_depth + 2, 3))
+        stack_goal = np.empty((max_depth + 2, 3))
+        stack_depth = np.empty(max_depth + 2, dtype=np.int64)
+        stack_start[0] = start
+        stack_goal[0] = goal
+        stack_depth[0] = 0
+        top = 1
+
+        while top > 0:
+            top -= 1
+            seg_start = stack_start[top].copy()
+            seg_goal = stack_goal[top].copy()
+            depth = stack_depth[top]
+            d2, closest = _closest_obstacle(seg_start, seg_goal, obs)
+
+            if (depth > 0 and d2 >= r2) or depth >= max_depth:
+                waypoints[count] = seg_goal
+                count += 1
+                continue
+
+            found = False
+            midpoint = seg_start
+            for side in (1.0, -1.0):
+                candidate = _detour_midpoint(seg_start, seg_goal, obs[closest],
+                                             side * detour_distance)
+                key = (round(candidate[0], 3), round(candidate[1], 3),
+                       round(candidate[2], 3))
+                seen = False
+                for i in range(n_visited):
+                    if (visited[i, 0] == key[0] and visited[i, 1] == key[1] and
+                            visited[i, 2] == key[2]):
+                        seen = True
+                        break
+                if not seen:
+                    visited[n_visited] = key
+                    n_visited += 1
+                    midpoint = candidate
+                    found = True
+                    break
+
+            if not found:
+                waypoints[count] = seg_goal
+                count += 1
+                continue
+
+            # Route both halves, first half first
+            stack_start[top] = midpoint
+            stack_goal[top] = seg_goal
+            stack_depth[top] = depth + 1
+            stack_start[top + 1] = seg_start
+            stack_goal[top + 1] = midpoint
+            stack_depth[top + 1] = depth + 1
+            top += 2
+
+        return waypoints[:count]
+
+    # Compile the small kernel once at import so the first planning request
+    # doesn't pay for it. detour_path takes seconds to compile, so it is left
+    # to warm_up(), which the planner pool runs as each worker starts;
+    # importing the planner stays cheap.
+    # The on-disk cache is left off: the package is imported both as
+    # "algorithms" (app) and "backend.algorithms" (tests) and Numba's cache
+    # entries are tied to the module name they were compiled under.
+    seg_dists_sq(0.0, 0.0, 0.0, 1.0, 0.0, 0.0, np.zeros((1, 3)))
+
+else:
+    # Without Numba, SimpleCollisionAvoidance plans with its own NumPy helpers
+    detour_path = None
+
+    def seg_dists_sq(sx, sy, sz, gx, gy, gz, obs):
+        """Squared distance from each row of obs (N, 3) to the segment s-g"""
+        start = np.array((sx, sy, sz))
+        line_vec = np.array((gx, gy, gz)) - start
+        diff = obs - start
+
+        line_length_sq = line_vec @ line_vec
+        if line_length_sq == 0:
+            # Segment has zero length, distance is to the start point
+            return (diff ** 2).sum(axis=1)
+
+        # Project every obstacle onto the segment and clamp to [0, 1]
+        t = np.clip(np.einsum('ij,j->i', diff, line_vec) / line_length_sq, 0, 1)
+        closest = t[:, None] * line_vec
+
+        return ((diff - closest) ** 2).sum(axis=1)
+
+
+def warm_up():
+    """Compile detour_path now instead of on its first planning call"""
+    if detour_path is not None:
+        # Same argument types as SimpleCollisionAvoidance passes
+        detour_path(np.zeros(3), np.array((1.0, 0.0, 0.0)), np.array([[0.5, 0.0, 0.0]]),
+                    0.09, 0.45, 1)
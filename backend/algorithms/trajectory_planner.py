@@ -1,5 +1,40 @@
 import math
-from typing import List, Tuple, Dict, Any
+from collections import OrderedDict, deque
+from itertools import chain
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+from ._kernels import detour_path, seg_dists_sq
+
+# Compiled scalar helpers, only present after `python setup.py build_ext --inplace`
+try:
+    from . import _geom
+except ImportError:
+    _geom = None
+
+# Below this many obstacles a linear scan is cheaper than building a KD-tree
+KDTREE_MIN_OBSTACLES = 16
+
+# validate_path only narrows obstacles with a KD-tree on paths with more
+# segments and obstacles than this; below it the full scan is faster
+VALIDATE_KDTREE_MIN_SEGMENTS = 16
+VALIDATE_KDTREE_MIN_OBSTACLES = 1000
+
+# KD-tree narrowing samples segments every half safety radius, but never
+# closer than this, so a zero safety radius doesn't divide by zero
+MIN_SAMPLE_SPACING = 1e-3
+
+# Detours nested deeper than this fall back to a straight segment
+MAX_DETOUR_DEPTH = 8
+
+# Number of planned paths remembered per planner
+PLAN_CACHE_SIZE = 256
 
 class SimpleCollisionAvoidance:
     """
@@ -8,8 +43,22 @@ class SimpleCollisionAvoidance:
     """
     
     def __init__(self, safety_radius: float = 0.3):
+        # LRU of planned paths, most recently used last
+        self._cache: OrderedDict[tuple, List[Tuple[float, float, float]]] = OrderedDict()
         self.safety_radius = safety_radius
     
+    @property
+    def safety_radius(self) -> float:
+        return self._safety_radius
+    
+    @safety_radius.setter
+    def safety_radius(self, value: float):
+        self._safety_radius = value
+        # Clearance checks compare squared distances against this
+        self._r2 = value * value
+        # Cached paths were planned for the old radius
+        self._cache.clear()
+    
     def plan_path(self, start: List[float], goal: List[float], obstacles: List[List[float]]) -> List[Tuple[float, float, float]]:
         """
         Plan a path from start to goal avoiding obstacles.
@@ -25,33 +74,193 @@ class SimpleCollisionAvoidance:
         start_point = (start[0], start[1], start[2])
         goal_point = (goal[0], goal[1], goal[2])
         
-        # Check if direct path is clear
-        if self._is_path_clear(start_point, goal_point, obstacles):
+        # Common small cases don't need any array setup
+        if len(obstacles) == 0:
             return [start_point, goal_point]
-        
-        # Find detour around obstacles
-        return self._find_detour_path(start_point, goal_point, obstacles)
+        if len(obstacles) == 1:
+            # Only x, y, z are read; obstacles may carry extra fields
+            path = self._plan_path_single(start_point, goal_point, tuple(obstacles[0][:3]))
+            if path is not None:
+                return path
+        
+        # Convert obstacles once; helpers below work on the (N, 3) array
+        obs_arr = self._as_obstacle_array(obstacles)
+        
+        # Planning is deterministic, so repeated scenarios can be served from the cache
+        key = (start_point, goal_point, obs_arr.tobytes())
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return list(cached)
+        
+        path = self._plan_path_general(start_point, goal_point, obs_arr)
+        
+        if len(self._cache) >= PLAN_CACHE_SIZE:
+            # Evict the least recently used entry
+            self._cache.popitem(last=False)
+        self._cache[key] = path
+        
+        return list(path)
     
-    def _is_path_clear(self, start: Tuple[float, float, float], 
-                      goal: Tuple[float, float, float], 
-                      obstacles: List[List[float]]) -> bool:
-        """Check if direct path from start to goal is clear of obstacles"""
+    def _plan_path_general(self, start_point: Tuple[float, float, float],
+                           goal_point: Tuple[float, float, float],
+                           obs_arr: np.ndarray) -> List[Tuple[float, float, float]]:
+        """plan_path for any number of obstacles, given as an (N, 3) array"""
+        # Index large obstacle sets so clearance checks only look nearby
+        tree = None
+        if cKDTree is not None and len(obs_arr) > KDTREE_MIN_OBSTACLES:
+            tree = cKDTree(obs_arr)
+        
+        # Internal helpers pass points around as float arrays
+        start_arr = np.array(start_point, dtype=np.float64)
+        goal_arr = np.array(goal_point, dtype=np.float64)
+        
+        if tree is None and detour_path is not None:
+            # Whole search in one compiled call
+            waypoints = detour_path(start_arr, goal_arr, np.ascontiguousarray(obs_arr),
+                                    self._r2, self.safety_radius * 1.5, MAX_DETOUR_DEPTH)
+            path = [start_point, *map(tuple, waypoints[1:-1].tolist()), goal_point]
+        else:
+            # Check if direct path is clear
+            if self._is_path_clear(start_arr, goal_arr, obs_arr, tree):
+                return [start_point, goal_point]
+            
+            # Find detour around obstacles, converting back to tuples only here
+            waypoints = self._find_detour_path(start_arr, goal_arr, obs_arr, tree)
+            path = [start_point, *(tuple(p.tolist()) for p in waypoints[1:-1]), goal_point]
         
-        for obstacle in obstacles:
-            obs_point = (obstacle[0], obstacle[1], obstacle[2])
+        return self._shortcut_path(path, obs_arr, tree)
+    
+    def _shortcut_path(self, path: List[Tuple[float, float, float]],
+                       obs_arr: np.ndarray,
+                       tree: Optional["cKDTree"] = None) -> List[Tuple[float, float, float]]:
+        """
+        Drop waypoints that a clear straight segment can skip.
+        
+        Detours are planned one obstacle at a time and often leave waypoints
+        that are not needed once the whole path is known. From each kept
+        waypoint, look for the farthest later waypoint it can reach in a
+        straight line: gallop ahead in doubling steps until a segment is
+        blocked, then bisect. That takes O(log K) clearance checks per kept
+        waypoint instead of O(K) for trying every pair.
+        """
+        if len(path) <= 3:
+            # start-goal is blocked, nothing to shortcut
+            return path
+        
+        points = np.array(path, dtype=np.float64)
+        last = len(path) - 1
+        kept = [path[0]]
+        i = 0
+        while i < last:
+            # The existing segment to i + 1 is always allowed
+            reach, blocked, step = i + 1, last + 1, 1
+            while reach < last:
+                probe = min(last, reach + step)
+                if not self._is_path_clear(points[i], points[probe], obs_arr, tree):
+                    blocked = probe
+                    break
+                reach, step = probe, step * 2
             
-            # Calculate distance from line segment to obstacle
-            distance = self._point_to_line_distance(start, goal, obs_point)
+            while blocked - reach > 1:
+                mid = (reach + blocked) // 2
+                if self._is_path_clear(points[i], points[mid], obs_arr, tree):
+                    reach = mid
+                else:
+                    blocked = mid
             
-            if distance < self.safety_radius:
-                return False
+            kept.append(path[reach])
+            i = reach
+        return kept
+    
+    def _plan_path_single(self, start: Tuple[float, float, float],
+                          goal: Tuple[float, float, float],
+                          obstacle: Tuple[float, float, float]) -> Optional[List[Tuple[float, float, float]]]:
+        """
+        plan_path for a single obstacle using scalar math only.
+        
+        Returns None when a single midpoint detour isn't enough, in which
+        case the caller falls back to the general search.
+        """
+        if self._point_to_line_distance_sq(start, goal, obstacle) >= self._r2:
+            return [start, goal]
+        
+        if _geom is not None:
+            midpoint = _geom.detour_midpoint(*start, *goal, *obstacle, self.safety_radius * 1.5)
+        else:
+            midpoint = tuple(self._calculate_detour_midpoint(start, goal, obstacle).tolist())
+        if (self._point_to_line_distance_sq(start, midpoint, obstacle) >= self._r2 and
+                self._point_to_line_distance_sq(midpoint, goal, obstacle) >= self._r2):
+            return [start, midpoint, goal]
+        
+        return None
+    
+    @staticmethod
+    def _as_obstacle_array(obstacles) -> np.ndarray:
+        """Convert a list of [x, y, z] obstacles to an (N, 3) float array"""
+        obs_arr = np.asarray(obstacles, dtype=np.float64)
+        if obs_arr.size == 0:
+            return obs_arr.reshape(0, 3)
+        # Only x, y, z are read; obstacles may carry extra fields. Contiguous
+        # so the compiled kernels see the layout they were compiled for
+        return np.ascontiguousarray(np.atleast_2d(obs_arr)[:, :3])
+    
+    @staticmethod
+    def _segment_distances_sq(start: np.ndarray,
+                              goal: np.ndarray,
+                              obs_arr: np.ndarray) -> np.ndarray:
+        """Squared distance from every obstacle to the segment start-goal"""
+        return seg_dists_sq(float(start[0]), float(start[1]), float(start[2]),
+                            float(goal[0]), float(goal[1]), float(goal[2]),
+                            obs_arr)
+    
+    def _nearby_obstacles(self, start: np.ndarray,
+                          goal: np.ndarray,
+                          obs_arr: np.ndarray,
+                          tree: Optional["cKDTree"],
+                          line_vec: Optional[np.ndarray] = None,
+                          line_length_sq: Optional[float] = None) -> np.ndarray:
+        """Obstacles that may lie within the safety radius of the segment"""
+        if tree is None:
+            return obs_arr
+        
+        if line_vec is None:
+            line_vec = goal - start
+            line_length_sq = line_vec @ line_vec
+        
+        # Sample the segment every half safety radius
+        seg_length = math.sqrt(line_length_sq)
+        spacing = max(self.safety_radius / 2, MIN_SAMPLE_SPACING)
+        num_samples = max(2, math.ceil(seg_length / spacing) + 1)
+        samples = start + np.linspace(0, 1, num_samples)[:, None] * line_vec
+        
+        # Anything within the safety radius of the segment is within this
+        # radius of its nearest sample
+        radius = math.hypot(self.safety_radius, seg_length / (num_samples - 1) / 2)
+        hits = tree.query_ball_point(samples, r=radius)
+        
+        # Keep original obstacle order so ties resolve as in a full scan
+        indices = np.unique(np.fromiter(chain.from_iterable(hits), dtype=np.intp))
+        return obs_arr[indices]
+    
+    def _is_path_clear(self, start: np.ndarray, 
+                      goal: np.ndarray, 
+                      obs_arr: np.ndarray,
+                      tree: Optional["cKDTree"] = None) -> bool:
+        """Check if direct path from start to goal is clear of obstacles"""
+        if len(obs_arr) == 0:
+            return True
         
-        return True
+        obs_arr = self._nearby_obstacles(start, goal, obs_arr, tree)
+        dists_sq = self._segment_distances_sq(start, goal, obs_arr)
+        return not (dists_sq < self._r2).any()
     
-    def _point_to_line_distance(self, line_start: Tuple[float, float, float],
-                               line_end: Tuple[float, float, float],
-                               point: Tuple[float, float, float]) -> float:
-        """Calculate minimum distance from point to line segment"""
+    def _point_to_line_distance_sq(self, line_start: Tuple[float, float, float],
+                                  line_end: Tuple[float, float, float],
+                                  point: Tuple[float, float, float]) -> float:
+        """Calculate squared minimum distance from point to line segment"""
+        if _geom is not None:
+            return _geom.point_to_seg_dist2(*line_start, *line_end, *point)
         
         # Vector from start to end
         line_vec = (line_end[0] - line_start[0], 
@@ -64,11 +273,15 @@ class SimpleCollisionAvoidance:
                    point[2] - line_start[2])
         
         # Length of line segment
-        line_length_sq = line_vec[0]**2 + line_vec[1]**2 + line_vec[2]**2
+        line_length_sq = (line_vec[0] * line_vec[0] +
+                          line_vec[1] * line_vec[1] +
+                          line_vec[2] * line_vec[2])
         
         if line_length_sq == 0:
             # Line segment has zero length
-            return math.sqrt(point_vec[0]**2 + point_vec[1]**2 + point_vec[2]**2)
+            return (point_vec[0] * point_vec[0] +
+                    point_vec[1] * point_vec[1] +
+                    point_vec[2] * point_vec[2])
         
         # Project point onto line
         t = max(0, min(1, (point_vec[0] * line_vec[0] + 
@@ -85,113 +298,174 @@ class SimpleCollisionAvoidance:
         dy = point[1] - closest_point[1]
         dz = point[2] - closest_point[2]
         
-        return math.sqrt(dx**2 + dy**2 + dz**2)
+        return dx * dx + dy * dy + dz * dz
     
-    def _find_detour_path(self, start: Tuple[float, float, float],
-                         goal: Tuple[float, float, float],
-                         obstacles: List[List[float]]) -> List[Tuple[float, float, float]]:
+    def _find_detour_path(self, start: np.ndarray,
+                         goal: np.ndarray,
+                         obstacles: np.ndarray,
+                         tree: Optional["cKDTree"] = None) -> List[np.ndarray]:
         """Find a detour path around obstacles using midpoint approach"""
         
-        # Find the obstacle closest to the direct path
-        closest_obstacle = None
-        min_distance = float('inf')
-        
-        for obstacle in obstacles:
-            obs_point = (obstacle[0], obstacle[1], obstacle[2])
-            distance = self._point_to_line_distance(start, goal, obs_point)
-            
-            if distance < min_distance:
-                min_distance = distance
-                closest_obstacle = obs_point
-        
-        if closest_obstacle is None:
-            return [start, goal]
+        waypoints = [start]
         
-        # Calculate midpoint detour
-        midpoint = self._calculate_detour_midpoint(start, goal, closest_obstacle)
+        # Midpoints already proposed (rounded to the millimetre); proposing one
+        # again would only re-plan the same failing segment
+        visited = set()
         
-        # Check if detour segments are clear
-        path1_clear = self._is_path_clear(start, midpoint, obstacles)
-        path2_clear = self._is_path_clear(midpoint, goal, obstacles)
+        # Segments still to route, processed depth-first from start to goal
+        pending = deque([(start, goal, 0)])
         
-        if path1_clear and path2_clear:
-            return [start, midpoint, goal]
-        else:
-            # Recursive detour if needed
-            if not path1_clear:
-                detour1 = self._find_detour_path(start, midpoint, obstacles)
-            else:
-                detour1 = [start, midpoint]
+        while pending:
+            seg_start, seg_goal, depth = pending.pop()
+            
+            # Segments below the top level are only split when blocked
+            if depth > 0 and self._is_path_clear(seg_start, seg_goal, obstacles, tree):
+                waypoints.append(seg_goal)
+                continue
+            
+            # Shared by the candidate search and the midpoint calculation
+            line_vec = seg_goal - seg_start
+            line_length_sq = float(line_vec @ line_vec)
+            
+            # The closest obstacle to a blocked segment is always among the nearby ones
+            candidates = self._nearby_obstacles(seg_start, seg_goal, obstacles, tree,
+                                                line_vec, line_length_sq)
+            if len(candidates) == 0 or depth >= MAX_DETOUR_DEPTH:
+                # Nothing to avoid, or give up and keep the straight segment
+                waypoints.append(seg_goal)
+                continue
+            
+            # Find the obstacle closest to the direct path
+            dists_sq = self._segment_distances_sq(seg_start, seg_goal, candidates)
+            closest_obstacle = candidates[int(np.argmin(dists_sq))]
             
-            if not path2_clear:
-                detour2 = self._find_detour_path(midpoint, goal, obstacles)
-            else:
-                detour2 = [midpoint, goal]
+            # Calculate midpoint detour, trying the other side if this one was seen
+            midpoint = None
+            for side in (1.0, -1.0):
+                candidate = self._calculate_detour_midpoint(seg_start, seg_goal, closest_obstacle,
+                                                            line_vec, line_length_sq, side)
+                key = tuple(round(c, 3) for c in candidate.tolist())
+                if key not in visited:
+                    visited.add(key)
+                    midpoint = candidate
+                    break
             
-            # Combine detours (remove duplicate midpoint)
-            return detour1[:-1] + detour2
+            if midpoint is None:
+                # Both sides already tried, keep the straight segment as best effort
+                waypoints.append(seg_goal)
+                continue
+            
+            # Route both halves, first half first
+            pending.append((midpoint, seg_goal, depth + 1))
+            pending.append((seg_start, midpoint, depth + 1))
+        
+        return waypoints
     
-    def _calculate_detour_midpoint(self, start: Tuple[float, float, float],
-                                  goal: Tuple[float, float, float],
-                                  obstacle: Tuple[float, float, float]) -> Tuple[float, float, float]:
-        """Calculate a detour midpoint around an obstacle"""
+    def _calculate_detour_midpoint(self, start: np.ndarray,
+                                  goal: np.ndarray,
+                                  obstacle: np.ndarray,
+                                  line_vec: Optional[np.ndarray] = None,
+                                  line_length_sq: Optional[float] = None,
+                                  side: float = 1.0) -> np.ndarray:
+        """
+        Calculate a detour midpoint around an obstacle.
         
-        # Vector from start to goal
-        goal_vec = (goal[0] - start[0], goal[1] - start[1], goal[2] - start[2])
+        Points may be given as arrays or (x, y, z) sequences. line_vec and
+        line_length_sq may be passed in when the caller has already computed
+        goal - start and its squared length. side=-1 places the midpoint on
+        the opposite side of the segment.
+        """
+        start = np.asarray(start, dtype=np.float64)
+        obstacle = np.asarray(obstacle, dtype=np.float64)
         
-        # Vector from start to obstacle
-        obs_vec = (obstacle[0] - start[0], obstacle[1] - start[1], obstacle[2] - start[2])
+        # Vector from start to goal
+        if line_vec is None:
+            line_vec = np.asarray(goal, dtype=np.float64) - start
+            line_length_sq = float(line_vec @ line_vec)
+        goal_vec = line_vec
         
         # Project obstacle onto goal line
-        goal_length_sq = goal_vec[0]**2 + goal_vec[1]**2 + goal_vec[2]**2
-        
-        if goal_length_sq == 0:
+        if line_length_sq == 0:
             # Goal is at start position
             return start
         
-        t = (obs_vec[0] * goal_vec[0] + obs_vec[1] * goal_vec[1] + obs_vec[2] * goal_vec[2]) / goal_length_sq
+        t = float((obstacle - start) @ goal_vec) / line_length_sq
         t = max(0, min(1, t))  # Clamp to [0, 1]
         
         # Projected point on line
-        projected = (start[0] + t * goal_vec[0],
-                    start[1] + t * goal_vec[1],
-                    start[2] + t * goal_vec[2])
+        projected = start + t * goal_vec
         
         # Vector from projected point to obstacle
-        offset_vec = (obstacle[0] - projected[0],
-                    obstacle[1] - projected[1],
-                    obstacle[2] - projected[2])
+        offset_vec = obstacle - projected
         
         # Calculate perpendicular direction
-        perpendicular = self._cross_product(goal_vec, offset_vec)
-        perpendicular_length = math.sqrt(perpendicular[0]**2 + perpendicular[1]**2 + perpendicular[2]**2)
+        perpendicular = np.cross(goal_vec, offset_vec)
+        perpendicular_length = math.sqrt(perpendicular @ perpendicular)
         
         if perpendicular_length == 0:
             # Vectors are parallel, use arbitrary perpendicular
-            perpendicular = (0, 0, 1) if goal_vec[2] == 0 else (1, 0, 0)
-            perpendicular_length = 1
-        
-        # Normalize perpendicular vector
-        perpendicular = (perpendicular[0] / perpendicular_length,
-                        perpendicular[1] / perpendicular_length,
-                        perpendicular[2] / perpendicular_length)
+            perpendicular = np.array((0.0, 0.0, 1.0) if goal_vec[2] == 0 else (1.0, 0.0, 0.0))
+            perpendicular_length = 1.0
         
         # Calculate detour distance
-        detour_distance = self.safety_radius * 1.5  # Add some margin
+        detour_distance = side * self.safety_radius * 1.5  # Add some margin
         
-        # Detour midpoint
-        detour_point = (projected[0] + detour_distance * perpendicular[0],
-                       projected[1] + detour_distance * perpendicular[1],
-                       projected[2] + detour_distance * perpendicular[2])
-        
-        return detour_point
+        # Scale the perpendicular in place to the detour offset (normalizes it
+        # in the same step) and add the projected point
+        perpendicular *= detour_distance / perpendicular_length
+        perpendicular += projected
+        return perpendicular
+    
+    @staticmethod
+    def _path_distances_sq(path_arr: np.ndarray, obs_arr: np.ndarray) -> np.ndarray:
+        """Squared distance from every obstacle to every path segment, shape (K-1, N)"""
+        seg_start = path_arr[:-1]
+        line_vec = path_arr[1:] - seg_start
+        point_vec = obs_arr[None, :, :] - seg_start[:, None, :]
+        
+        # Project every obstacle onto every segment; zero-length segments keep t = 0.
+        # einsum contracts the xyz axis without a (K-1, N, 3) product temporary
+        line_length_sq = np.einsum('ij,ij->i', line_vec, line_vec)[:, None]
+        projection = np.einsum('kmj,kj->km', point_vec, line_vec)
+        t = np.divide(projection, line_length_sq,
+                      out=np.zeros_like(projection), where=line_length_sq > 0)
+        np.clip(t, 0, 1, out=t)
+        
+        # Offset from the closest point on each segment, reusing point_vec
+        point_vec -= t[:, :, None] * line_vec[:, None, :]
+        return np.einsum('kmj,kmj->km', point_vec, point_vec)
     
-    def _cross_product(self, a: Tuple[float, float, float], 
-                      b: Tuple[float, float, float]) -> Tuple[float, float, float]:
-        """Calculate cross product of two 3D vectors"""
-        return (a[1] * b[2] - a[2] * b[1],
-                a[2] * b[0] - a[0] * b[2],
-                a[0] * b[1] - a[1] * b[0])
+    def _obstacles_near_path(self, path_arr: np.ndarray, obs_arr: np.ndarray) -> np.ndarray:
+        """Subset of obs_arr that always contains the obstacle closest to the path"""
+        tree = cKDTree(obs_arr)
+        
+        # Sample every segment at most half a safety radius apart
+        seg_vec = np.diff(path_arr, axis=0)
+        seg_length = np.sqrt(np.einsum('ij,ij->i', seg_vec, seg_vec))
+        spacing = max(self.safety_radius / 2, MIN_SAMPLE_SPACING)
+        counts = np.maximum(1, np.ceil(seg_length / spacing).astype(np.intp))
+        seg_idx = np.repeat(np.arange(len(seg_vec)), counts)
+        frac = (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)) / counts[seg_idx]
+        samples = np.vstack((path_arr[seg_idx] + frac[:, None] * seg_vec[seg_idx], path_arr[-1:]))
+        
+        # The nearest obstacle to any sample bounds the minimum separation from
+        # above; every obstacle at least that close to the path is within this
+        # radius of its nearest sample (plus slack so rounding can't drop the
+        # obstacle that set the bound)
+        upper = tree.query(samples)[0].min()
+        radius = math.hypot(upper, (seg_length / counts).max() / 2) * (1 + 1e-9)
+        hits = tree.query_ball_point(samples, r=radius)
+        
+        indices = np.unique(np.fromiter(chain.from_iterable(hits), dtype=np.intp))
+        return obs_arr[indices]
+    
+    @staticmethod
+    def path_length(path) -> float:
+        """Total length of a path given as a sequence of (x, y, z) waypoints"""
+        if len(path) < 2:
+            return 0.0
+        path_arr = np.asarray(path, dtype=np.float64)
+        return float(np.linalg.norm(np.diff(path_arr, axis=0), axis=1).sum())
     
     def validate_path(self, path: List[Tuple[float, float, float]], 
                      obstacles: List[List[float]]) -> Dict[str, Any]:
@@ -210,24 +484,23 @@ class SimpleCollisionAvoidance:
                 "success": False
             }
         
+        path_arr = np.asarray(path, dtype=np.float64)
+        
         # Calculate path length
-        path_length = 0
-        for i in range(1, len(path)):
-            dx = path[i][0] - path[i-1][0]
-            dy = path[i][1] - path[i-1][1]
-            dz = path[i][2] - path[i-1][2]
-            path_length += math.sqrt(dx**2 + dy**2 + dz**2)
+        path_length = self.path_length(path_arr)
         
         # Calculate minimum separation from obstacles
-        min_separation = float('inf')
-        for i in range(len(path) - 1):
-            for obstacle in obstacles:
-                obs_point = (obstacle[0], obstacle[1], obstacle[2])
-                distance = self._point_to_line_distance(path[i], path[i+1], obs_point)
-                min_separation = min(min_separation, distance)
-        
-        # Check if path is safe
-        safe = min_separation >= self.safety_radius
+        obs_arr = self._as_obstacle_array(obstacles)
+        if (cKDTree is not None and len(obs_arr) > VALIDATE_KDTREE_MIN_OBSTACLES and
+                len(path_arr) - 1 > VALIDATE_KDTREE_MIN_SEGMENTS):
+            obs_arr = self._obstacles_near_path(path_arr, obs_arr)
+        min_separation_sq = float('inf')
+        if len(obs_arr):
+            min_separation_sq = float(self._path_distances_sq(path_arr, obs_arr).min())
+        min_separation = math.sqrt(min_separation_sq)
+        
+        # Check if path is safe, with the same squared test plan_path uses
+        safe = min_separation_sq >= self._r2
         
         return {
             "valid": safe,
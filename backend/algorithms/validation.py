@@ -0,0 +1,32 @@
+"""
+Planning of /validate/algorithm test cases.
+
+The API runs plan_test_case in its planner worker processes. Workers import
+only this module and the planner, not the whole app.
+"""
+import time
+from typing import Any, Dict
+
+from .trajectory_planner import SimpleCollisionAvoidance
+
+# One planner per process, so its path cache carries over between test cases
+planner = SimpleCollisionAvoidance()
+
+def plan_test_case(test_case: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan a single validation test case; runs in a planner worker process"""
+    start = test_case["start"]
+    goal = test_case["goal"]
+    obstacles = test_case.get("obstacles", [])
+    
+    # Monotonic, high resolution; time.time() rounds sub-ms plans to 0
+    start_ns = time.perf_counter_ns()
+    path = planner.plan_path(start, goal, obstacles)
+    planning_time = (time.perf_counter_ns() - start_ns) / 1e6  # ms
+    
+    return {
+        "testCase": test_case,
+        "path": path,
+        "planningTimeMs": planning_time,
+        "pathLengthM": planner.path_length(path),
+        "success": len(path) > 0
+    }
@@ -4,10 +4,13 @@ import sqlite3
 import json
 import csv
 import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 import uvicorn
@@ -16,8 +19,9 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-from simulators.mock_simulator import DroneSimulator
-from algorithms.trajectory_planner import SimpleCollisionAvoidance
+from simulators.mock_simulator import DroneSimulator, LOG_SCHEMA_SQL
+from algorithms._kernels import warm_up as warm_up_planner
+from algorithms.validation import plan_test_case
 
 # Configuration
 BACKEND = os.getenv("BACKEND", "mock")
@@ -25,12 +29,16 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
 MAX_DRONES = int(os.getenv("MAX_DRONES", "10"))
 SIMULATION_SPEED = float(os.getenv("SIMULATION_SPEED", "1.0"))
 BEARER_TOKEN = os.getenv("BEARER_TOKEN", "demo-token")
+PLANNER_WORKERS = int(os.getenv("PLANNER_WORKERS", "2"))
+TORCH_DEVICE = os.getenv("TORCH_DEVICE") or None  # mock_batched only; default cuda if available
+TORCH_BATCH_MIN_DRONES = int(os.getenv("TORCH_BATCH_MIN_DRONES", "1"))  # mock_batched only
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Crazyflie Swarm Demo API",
     description="Mock simulator for Crazyflie swarm control",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -47,46 +55,30 @@ security = HTTPBearer(auto_error=False)  # Make bearer token optional
 
 # Global simulator instance
 simulator = None
-planner = SimpleCollisionAvoidance()
 
 # Database setup
 def init_db():
     conn = sqlite3.connect('swarm_logs.db')
     cursor = conn.cursor()
     
-    # Create runs table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS runs (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            startedAt TEXT,
-            endedAt TEXT,
-            status TEXT
-        )
-    ''')
-    
-    # Create samples table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS samples (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            runId TEXT,
-            droneId TEXT,
-            t REAL,
-            x REAL,
-            y REAL,
-            z REAL,
-            vx REAL,
-            vy REAL,
-            vz REAL,
-            battery REAL,
-            status TEXT,
-            FOREIGN KEY (runId) REFERENCES runs (id)
-        )
-    ''')
+    # Runs and samples tables, shared with the simulator
+    cursor.executescript(LOG_SCHEMA_SQL)
+    
+    # WAL lets log readers run alongside the simulator's writes; the mode is
+    # stored in the database file
+    cursor.execute('PRAGMA journal_mode=WAL')
     
     conn.commit()
     conn.close()
 
+def open_log_db() -> sqlite3.Connection:
+    """Open the connection shared by all log requests"""
+    # Requests read through it from worker threads
+    conn = sqlite3.connect('swarm_logs.db', check_same_thread=False)
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA mmap_size=268435456')
+    return conn
+
 # Authentication
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials:
@@ -115,6 +107,10 @@ class GotoRequest(BaseModel):
     z: float
     speed: float = 0.5
 
+class SwarmGotoRequest(BaseModel):
+    targets: Dict[str, Tuple[float, float, float]]  # drone id -> (x, y, z)
+    speed: float = 0.5
+
 class FormationRequest(BaseModel):
     formation: str  # "line", "circle", "grid", "vshape"
     parameters: Dict[str, Any] = {}
@@ -134,10 +130,19 @@ class AlgorithmValidationRequest(BaseModel):
 async def startup_event():
     global simulator
     init_db()
+    app.state.db = open_log_db()
+    app.state.pool = create_planner_pool()
     
     if BACKEND == "mock":
         simulator = DroneSimulator()
         await simulator.start()
+    elif BACKEND == "mock_batched":
+        # Mock simulator with the tick batched in PyTorch, for large swarms.
+        # Imported here so other backends never pay for loading torch.
+        from simulators.batched_simulator import BatchedDroneSimulator
+        simulator = BatchedDroneSimulator(device=TORCH_DEVICE,
+                                          batch_min_drones=TORCH_BATCH_MIN_DRONES)
+        await simulator.start()
     else:
         # TODO: Initialize ROS 2 adapter
         raise NotImplementedError("ROS 2 backend not implemented yet")
@@ -148,6 +153,8 @@ async def shutdown_event():
     global simulator
     if simulator:
         await simulator.stop()
+    app.state.db.close()
+    app.state.pool.shutdown()
 
 # Health check
 @app.get("/health")
@@ -175,6 +182,15 @@ async def get_drones(token: Optional[str] = Depends(optional_auth)):
     
     return await simulator.get_all_states()
 
+@app.get("/drones/frame")
+async def get_drones_frame(token: Optional[str] = Depends(optional_auth)):
+    if not simulator:
+        raise HTTPException(status_code=500, detail="Simulator not initialized")
+    
+    # All drones in one packed frame, for clients polling at the tick rate
+    frame = await simulator.get_state_frame()
+    return Response(content=frame, media_type="application/octet-stream")
+
 @app.post("/drones/{drone_id}/takeoff")
 async def takeoff(drone_id: str, request: TakeoffRequest, token: str = Depends(verify_token)):
     if not simulator:
@@ -231,6 +247,24 @@ async def get_drone_state(drone_id: str, token: Optional[str] = Depends(optional
     return state
 
 # Swarm operations
+@app.post("/swarm/goto")
+async def swarm_goto(request: SwarmGotoRequest, token: str = Depends(verify_token)):
+    if not simulator:
+        raise HTTPException(status_code=500, detail="Simulator not initialized")
+    
+    # Bounds checking, same limits as single-drone goto
+    targets = list(request.targets.values())
+    if any(abs(x) > 1.0 or abs(y) > 1.0 or z > 1.0 for x, y, z in targets):
+        raise HTTPException(status_code=400, detail="Position out of bounds")
+    
+    if request.speed > 1.0:
+        raise HTTPException(status_code=400, detail="Speed must be <= 1.0 m/s")
+    
+    # One command for the whole swarm instead of one request per drone
+    accepted = await simulator.goto_many(list(request.targets), targets)
+    
+    return {"ok": all(accepted), "accepted": dict(zip(request.targets, accepted))}
+
 @app.post("/swarm/formation")
 async def set_formation(request: FormationRequest, token: str = Depends(verify_token)):
     if not simulator:
@@ -248,65 +282,79 @@ async def run_experiment(request: ExperimentRequest, token: str = Depends(verify
     if not simulator:
         raise HTTPException(status_code=500, detail="Simulator not initialized")
     
-    result = await simulator.run_experiment(
-        request.scenario,
-        request.numDrones,
-        request.duration,
-        request.parameters
-    )
+    try:
+        result = await simulator.run_experiment(
+            request.scenario,
+            request.numDrones,
+            request.duration,
+            request.parameters
+        )
+    except ValueError as e:
+        # Invalid parameters, e.g. a non-positive log_stride
+        raise HTTPException(status_code=400, detail=str(e))
     
     return result
 
 # Logging and data export
+LOG_COLUMNS = ['t', 'x', 'y', 'z', 'vx', 'vy', 'vz', 'battery', 'status', 'droneId']
+LOG_QUERY = '''
+    SELECT t, x, y, z, vx, vy, vz, battery, status, droneId
+    FROM samples 
+    WHERE runId = ? 
+    ORDER BY t, droneId
+'''
+LOG_BATCH_SIZE = 1000  # rows per streamed CSV chunk
+
+def fetch_log_samples(conn: sqlite3.Connection, run_id: str) -> List[Dict[str, Any]]:
+    """Read all samples of a run as a list of dicts (blocking)"""
+    cursor = conn.execute(LOG_QUERY, (run_id,))
+    return [dict(zip(LOG_COLUMNS, row)) for row in cursor]
+
+def fetch_log_columns(conn: sqlite3.Connection, run_id: str) -> Dict[str, List[Any]]:
+    """Read all samples of a run as one list per column (blocking)"""
+    rows = conn.execute(LOG_QUERY, (run_id,)).fetchall()
+    columns = zip(*rows) if rows else ([] for _ in LOG_COLUMNS)
+    return dict(zip(LOG_COLUMNS, map(list, columns)))
+
+def stream_log_csv(conn: sqlite3.Connection, run_id: str):
+    """Yield the samples of a run as CSV text, one batch of rows at a time"""
+    cursor = conn.execute(LOG_QUERY, (run_id,))
+    try:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(LOG_COLUMNS)
+        
+        while True:
+            rows = cursor.fetchmany(LOG_BATCH_SIZE)
+            writer.writerows(rows)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+            if not rows:
+                break
+    finally:
+        cursor.close()
+
 @app.get("/logs")
 async def get_logs(
     runId: str = Query(...),
     format: str = Query("json", regex="^(json|csv)$"),
+    layout: str = Query("rows", regex="^(rows|columns)$"),
     token: Optional[str] = Depends(optional_auth)
 ):
-    conn = sqlite3.connect('swarm_logs.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT t, x, y, z, vx, vy, vz, battery, status, droneId
-        FROM samples 
-        WHERE runId = ? 
-        ORDER BY t, droneId
-    ''', (runId,))
-    
-    samples = cursor.fetchall()
-    conn.close()
-    
     if format == "csv":
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['t', 'x', 'y', 'z', 'vx', 'vy', 'vz', 'battery', 'status', 'droneId'])
-        writer.writerows(samples)
-        
-        from fastapi.responses import Response
-        return Response(
-            content=output.getvalue(),
+        return StreamingResponse(
+            stream_log_csv(app.state.db, runId),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename={runId}.csv"}
         )
-    else:
-        return {
-            "samples": [
-                {
-                    "t": row[0],
-                    "x": row[1],
-                    "y": row[2],
-                    "z": row[3],
-                    "vx": row[4],
-                    "vy": row[5],
-                    "vz": row[6],
-                    "battery": row[7],
-                    "status": row[8],
-                    "droneId": row[9]
-                }
-                for row in samples
-            ]
-        }
+    
+    # Keep the blocking sqlite read off the event loop. The columnar layout
+    # returns one list per field instead of one dict per sample, which is
+    # much smaller for long runs.
+    fetch = fetch_log_columns if layout == "columns" else fetch_log_samples
+    samples = await asyncio.to_thread(fetch, app.state.db, runId)
+    return {"samples": samples}
 
 # Emergency stop
 @app.post("/emergency/stop")
@@ -327,38 +375,29 @@ async def reset_simulation(token: str = Depends(verify_token)):
     return {"ok": True}
 
 # Algorithm validation
+def create_planner_pool() -> ProcessPoolExecutor:
+    """Worker processes for /validate/algorithm"""
+    # Forking this process would copy its event loop, worker threads and
+    # sqlite connection mid-use; workers start from a clean interpreter instead
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    # Workers compile the detour kernel as they start, so the first test
+    # case each of them plans isn't timed with the compile in it
+    return ProcessPoolExecutor(max_workers=PLANNER_WORKERS, mp_context=context,
+                               initializer=warm_up_planner)
+
 @app.post("/validate/algorithm")
 async def validate_algorithm(request: AlgorithmValidationRequest, token: str = Depends(verify_token)):
     if request.algorithm != "simple_collision_avoidance":
         raise HTTPException(status_code=400, detail="Unknown algorithm")
     
-    results = []
-    for test_case in request.testCases:
-        start = test_case["start"]
-        goal = test_case["goal"]
-        obstacles = test_case.get("obstacles", [])
-        
-        import time
-        start_time = time.time()
-        path = planner.plan_path(start, goal, obstacles)
-        planning_time = (time.time() - start_time) * 1000  # ms
-        
-        # Calculate metrics
-        path_length = 0
-        if len(path) > 1:
-            for i in range(1, len(path)):
-                dx = path[i][0] - path[i-1][0]
-                dy = path[i][1] - path[i-1][1]
-                dz = path[i][2] - path[i-1][2]
-                path_length += (dx**2 + dy**2 + dz**2)**0.5
-        
-        results.append({
-            "testCase": test_case,
-            "path": path,
-            "planningTimeMs": planning_time,
-            "pathLengthM": path_length,
-            "success": len(path) > 0
-        })
+    # Planning is pure CPU work; spread the test cases over the worker
+    # processes so the event loop stays free
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(app.state.pool, plan_test_case, test_case)
+        for test_case in request.testCases
+    ))
     
     return {"results": results}
 
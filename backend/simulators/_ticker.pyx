@@ -0,0 +1,89 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Cython build of the mock simulator's physics step.
+
+Optional: build with `python setup.py build_ext --inplace`. When the compiled
+module is present, physics.py uses it in place of the Numba/NumPy
+versions. The math must stay in step with physics.step and flag_errors.
+"""
+from libc.math cimport sqrt, fabs
+
+# Status codes, in DroneStatus declaration order (see physics.py)
+cdef enum:
+    IDLE, TAKING_OFF, FLYING, LANDING, ERROR
+
+cdef double ARRIVED_DIST_SQ = 0.05 * 0.05
+
+
+cpdef void step(double[:, ::1] pos, double[:, ::1] vel, double[:, ::1] target,
+                signed char[::1] status, double[::1] battery,
+                double[::1] takeoff_height, double[::1] takeoff_start,
+                double[::1] takeoff_duration, Py_ssize_t[::1] rows,
+                double t, double dt, double max_speed, double drain) noexcept nogil:
+    """Drain battery and advance each drone in rows by one tick"""
+    cdef Py_ssize_t k, i
+    cdef double elapsed, target_z, vz, dx, dy, dz, distance_sq, distance, scale
+
+    for k in range(rows.shape[0]):
+        i = rows[k]
+
+        # Update battery
+        battery[i] = max(0.0, battery[i] - drain)
+
+        if status[i] == TAKING_OFF:
+            elapsed = t - takeoff_start[i]
+            if elapsed >= takeoff_duration[i]:
+                # Takeoff complete
+                pos[i, 2] = takeoff_height[i]
+                vel[i, 2] = 0.0
+                status[i] = FLYING
+            else:
+                # Smooth takeoff, simple PID-like control
+                target_z = takeoff_height[i] * (elapsed / takeoff_duration[i])
+                vz = (target_z - pos[i, 2]) * 2.0
+                vz = min(max_speed, max(-max_speed, vz))
+                vel[i, 2] = vz
+                pos[i, 2] += vz * dt
+
+        elif status[i] == FLYING:
+            dx = target[i, 0] - pos[i, 0]
+            dy = target[i, 1] - pos[i, 1]
+            dz = target[i, 2] - pos[i, 2]
+            distance_sq = dx * dx + dy * dy + dz * dz
+            if distance_sq > ARRIVED_DIST_SQ:
+                # Normalize direction and slow down when close
+                distance = sqrt(distance_sq)
+                scale = max_speed * min(1.0, distance / 0.1) / distance
+                vel[i, 0] = dx * scale
+                vel[i, 1] = dy * scale
+                vel[i, 2] = dz * scale
+                pos[i, 0] += vel[i, 0] * dt
+                pos[i, 1] += vel[i, 1] * dt
+                pos[i, 2] += vel[i, 2] * dt
+            else:
+                # Close enough to target
+                vel[i, 0] = 0.0
+                vel[i, 1] = 0.0
+                vel[i, 2] = 0.0
+
+        elif status[i] == LANDING:
+            dz = -pos[i, 2]
+            if fabs(dz) > 0.05:
+                vz = min(max_speed, max(-max_speed, dz * 2.0))
+                vel[i, 2] = vz
+                pos[i, 2] += vz * dt
+            else:
+                # Landing complete
+                pos[i, 2] = 0.0
+                vel[i, 2] = 0.0
+                status[i] = IDLE
+
+
+cpdef void flag_errors(double[:, ::1] pos, double[::1] battery, signed char[::1] status,
+                       Py_ssize_t n, double bounds, double max_height) noexcept nogil:
+    """Set ERROR on the first n drones if out of battery or outside the workspace"""
+    cdef Py_ssize_t i
+    for i in range(n):
+        if (battery[i] <= 0.0 or fabs(pos[i, 0]) > bounds or
+                fabs(pos[i, 1]) > bounds or pos[i, 2] > max_height):
+            status[i] = ERROR
@@ -0,0 +1,122 @@
+"""
+Torch-batched variant of the mock simulator for large swarms.
+
+Optional: needs PyTorch. State stays in the SwarmArrays columns that
+DroneState views, logging and the API read; each tick runs as tensor ops
+over those columns. On the CPU the tensors share memory with the arrays,
+on a GPU the columns are copied over and back once per tick.
+"""
+import time
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+from . import physics
+from .mock_simulator import DroneSimulator
+
+# SwarmArrays columns the tick reads or writes, in _tensor_step order
+TICK_COLUMNS = ('pos', 'vel', 'target', 'status', 'battery',
+                'takeoff_height', 'takeoff_start', 'takeoff_duration')
+
+
+def _tensor_step(pos, vel, target, status, battery,
+                 takeoff_height, takeoff_start, takeoff_duration,
+                 t, dt, max_speed, drain):
+    """physics.step for every row at once, on tensors"""
+    # Update battery
+    battery.sub_(drain).clamp_(min=0.0)
+
+    # Masks are taken up front so a drone that changes status this tick
+    # isn't advanced twice
+    rows = torch.arange(len(status), device=status.device)
+    taking_off = rows[status == physics.TAKING_OFF]
+    flying = rows[status == physics.FLYING]
+    landing = rows[status == physics.LANDING]
+
+    # Takeoff
+    elapsed = t - takeoff_start[taking_off]
+    done = elapsed >= takeoff_duration[taking_off]
+    finished = taking_off[done]
+    pos[finished, 2] = takeoff_height[finished]
+    vel[finished, 2] = 0.0
+    status[finished] = physics.FLYING
+
+    climbing = taking_off[~done]
+    target_z = takeoff_height[climbing] * (elapsed[~done] / takeoff_duration[climbing])
+    vz = ((target_z - pos[climbing, 2]) * 2.0).clamp(-max_speed, max_speed)
+    vel[climbing, 2] = vz
+    pos[climbing, 2] += vz * dt
+
+    # Flying
+    delta = target[flying] - pos[flying]
+    distance_sq = (delta * delta).sum(dim=1)
+    moving = distance_sq > physics.ARRIVED_DIST_SQ
+    m = flying[moving]
+    d = distance_sq[moving].sqrt()
+    velocity = delta[moving] * (max_speed * (d / 0.1).clamp(max=1.0) / d)[:, None]
+    vel[m] = velocity
+    pos[m] += velocity * dt
+    vel[flying[~moving]] = 0.0
+
+    # Landing
+    dz = -pos[landing, 2]
+    descending = dz.abs() > 0.05
+    d = landing[descending]
+    vz = (dz[descending] * 2.0).clamp(-max_speed, max_speed)
+    vel[d, 2] = vz
+    pos[d, 2] += vz * dt
+
+    landed = landing[~descending]
+    pos[landed, 2] = 0.0
+    vel[landed, 2] = 0.0
+    status[landed] = physics.IDLE
+
+
+class BatchedDroneSimulator(DroneSimulator):
+    """DroneSimulator whose tick runs as batched torch tensor ops"""
+
+    def __init__(self, device=None, batch_min_drones: int = 1, db_path: str = 'swarm_logs.db'):
+        if torch is None:
+            raise ImportError("BatchedDroneSimulator needs PyTorch (pip install torch)")
+        super().__init__(db_path)
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        # Swarms smaller than this run the compiled per-drone step instead,
+        # which is faster for a few dozen drones or fewer
+        self.batch_min_drones = batch_min_drones
+        self._noise_scale_t = torch.as_tensor(self._noise_scale, device=self.device)
+
+    async def _update_drones(self):
+        """Update physics for all drones in one batch of tensor ops"""
+        current_time = time.time()
+        arrays = self._arrays
+        n = arrays.size
+        if n < self.batch_min_drones:
+            return await super()._update_drones()
+
+        # Zero-copy views of the first n rows on the CPU, copies on a GPU
+        columns = [torch.as_tensor(getattr(arrays, name)[:n], device=self.device)
+                   for name in TICK_COLUMNS]
+        pos, vel, _, status, battery = columns[:5]
+
+        _tensor_step(*columns, current_time, self.dt, self.max_speed,
+                     self.battery_drain_rate * self.dt)
+
+        # Apply noise to sensors
+        noise = torch.randn((n, 6), dtype=pos.dtype, device=self.device) * self._noise_scale_t
+        pos += noise[:, :3]
+        vel += noise[:, 3:]
+
+        # Check for errors
+        error = ((battery <= 0) |
+                 (pos[:, :2].abs() > self.workspace_bounds).any(dim=1) |
+                 (pos[:, 2] > self.max_height))
+        status[error] = physics.ERROR
+
+        if self.device.type != "cpu":
+            # Only these columns change during a tick
+            for name, column in (('pos', pos), ('vel', vel), ('status', status), ('battery', battery)):
+                getattr(arrays, name)[:n] = column.cpu().numpy()
+
+        arrays.last_update[:n] = current_time
@@ -1,14 +1,23 @@
 import asyncio
 import sqlite3
 import json
+import logging
 import math
-import random
+import struct
 import time
+from functools import lru_cache
 from datetime import datetime
+from itertools import repeat
+from operator import attrgetter
 from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+
+from . import physics
+
+logger = logging.getLogger(__name__)
+
 class DroneStatus(Enum):
     IDLE = "idle"
     TAKING_OFF = "takingOff"
@@ -16,32 +25,261 @@ class DroneStatus(Enum):
     LANDING = "landing"
     ERROR = "error"
 
-@dataclass
+# Statuses are stored as int8 codes in SwarmArrays.status; physics defines
+# the codes in declaration order
+STATUSES = tuple(DroneStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+STATUS_VALUES = tuple(status.value for status in STATUSES)
+_IDLE = physics.IDLE
+
+class SwarmArrays:
+    """Structure-of-arrays storage for the state of a swarm, one row per drone"""
+
+    def __init__(self, capacity: int = 8):
+        self.size = 0
+        # Per-row labels, kept as lists so log batches can zip them directly
+        self.ids: List[str] = []
+        self.run_ids: List[str] = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.pos = np.zeros((capacity, 3))
+        self.vel = np.zeros((capacity, 3))
+        self.target = np.zeros((capacity, 3))
+        self.battery = np.full(capacity, 100.0)
+        self.status = np.full(capacity, _IDLE, dtype=np.int8)
+        self.takeoff_height = np.zeros(capacity)
+        self.takeoff_start = np.zeros(capacity)
+        self.takeoff_duration = np.zeros(capacity)
+        self.land_start = np.zeros(capacity)
+        self.last_update = np.zeros(capacity)
+        # Last state written to the samples table, for delta logging
+        self.logged = np.full((capacity, 7), np.inf)
+        self.logged_status = np.full(capacity, -1, dtype=np.int8)
+
+    def add(self, drone_id: str, run_id: str) -> int:
+        """Append a row with default values and return its index"""
+        return self.add_many([drone_id], run_id)[0]
+
+    def add_many(self, drone_ids: List[str], run_id: str) -> range:
+        """Append one row with default values per drone id and return their indices"""
+        count = len(drone_ids)
+        capacity = len(self.battery)
+        if self.size + count > capacity:
+            # Grow geometrically; DroneState views index into the new arrays
+            old = vars(self).copy()
+            self._allocate(max(8, capacity * 2, self.size + count))
+            for name, array in old.items():
+                if isinstance(array, np.ndarray):
+                    getattr(self, name)[:capacity] = array
+
+        rows = range(self.size, self.size + count)
+        self.size += count
+        self.reset_row(slice(rows.start, rows.stop))
+        self.ids.extend(drone_ids)
+        self.run_ids.extend([run_id] * count)
+        return rows
+
+    def reset_row(self, index):
+        """Restore the default values of one row, or a slice of rows"""
+        self.pos[index] = 0.0
+        self.vel[index] = 0.0
+        self.target[index] = 0.0
+        self.battery[index] = 100.0
+        self.status[index] = _IDLE
+        self.takeoff_height[index] = 0.0
+        self.takeoff_start[index] = 0.0
+        self.takeoff_duration[index] = 0.0
+        self.land_start[index] = 0.0
+        self.last_update[index] = 0.0
+        self.logged[index] = np.inf
+        self.logged_status[index] = -1
+
+    def clear(self):
+        self.size = 0
+        self.ids.clear()
+        self.run_ids.clear()
+
+def _vector_field(array: str, axis: int) -> property:
+    def fget(self) -> float:
+        return float(getattr(self._arrays, array)[self._index, axis])
+
+    def fset(self, value: float):
+        getattr(self._arrays, array)[self._index, axis] = value
+
+    return property(fget, fset)
+
+def _scalar_field(array: str) -> property:
+    def fget(self) -> float:
+        return float(getattr(self._arrays, array)[self._index])
+
+    def fset(self, value: float):
+        getattr(self._arrays, array)[self._index] = value
+
+    return property(fget, fset)
+
 class DroneState:
-    id: str
-    x: float = 0.0
-    y: float = 0.0
-    z: float = 0.0
-    vx: float = 0.0
-    vy: float = 0.0
-    vz: float = 0.0
-    battery: float = 100.0
-    status: DroneStatus = DroneStatus.IDLE
-    target_x: float = 0.0
-    target_y: float = 0.0
-    target_z: float = 0.0
-    takeoff_height: float = 0.0
-    takeoff_start: float = 0.0
-    takeoff_duration: float = 0.0
-    land_start: float = 0.0
-    last_update: float = 0.0
+    """View of one drone's row in a SwarmArrays store"""
+
+    __slots__ = ('_arrays', '_index')
+
+    def __init__(self, id: str, run_id: str = "default",
+                 arrays: Optional[SwarmArrays] = None, index: Optional[int] = None,
+                 **fields: Any):
+        if arrays is None:
+            # Standalone drone with a private one-row store
+            arrays = SwarmArrays(capacity=1)
+            index = arrays.add(id, run_id)
+        self._arrays = arrays
+        self._index = index
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    x = _vector_field('pos', 0)
+    y = _vector_field('pos', 1)
+    z = _vector_field('pos', 2)
+    vx = _vector_field('vel', 0)
+    vy = _vector_field('vel', 1)
+    vz = _vector_field('vel', 2)
+    target_x = _vector_field('target', 0)
+    target_y = _vector_field('target', 1)
+    target_z = _vector_field('target', 2)
+    battery = _scalar_field('battery')
+    takeoff_height = _scalar_field('takeoff_height')
+    takeoff_start = _scalar_field('takeoff_start')
+    takeoff_duration = _scalar_field('takeoff_duration')
+    land_start = _scalar_field('land_start')
+    last_update = _scalar_field('last_update')
+
+    @property
+    def id(self) -> str:
+        return self._arrays.ids[self._index]
+
+    @property
+    def run_id(self) -> str:
+        return self._arrays.run_ids[self._index]
+
+    @property
+    def status(self) -> DroneStatus:
+        return STATUSES[self._arrays.status[self._index]]
+
+    @status.setter
+    def status(self, value: DroneStatus):
+        self._arrays.status[self._index] = STATUS_CODES[value]
+
+    @property
+    def status_code(self) -> int:
+        """Raw int status code, for comparisons without the enum lookup"""
+        return int(self._arrays.status[self._index])
+
+    @status_code.setter
+    def status_code(self, value: int):
+        self._arrays.status[self._index] = value
+
+    @property
+    def status_value(self) -> str:
+        """API string for the status, without going through the enum"""
+        return STATUS_VALUES[self._arrays.status[self._index]]
+
+    def __repr__(self) -> str:
+        return (f"DroneState(id={self.id!r}, x={self.x}, y={self.y}, z={self.z}, "
+                f"battery={self.battery}, status={self.status})")
+
+# Header of a binary state frame: tick count, drone count, time.time()
+FRAME_HEADER = struct.Struct('<IId')
+
+# Tables the simulator logs to and the API reads; created if missing by both
+LOG_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS runs (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        startedAt TEXT,
+        endedAt TEXT,
+        status TEXT
+    );
+    CREATE TABLE IF NOT EXISTS samples (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        runId TEXT,
+        droneId TEXT,
+        t REAL,
+        x REAL,
+        y REAL,
+        z REAL,
+        vx REAL,
+        vy REAL,
+        vz REAL,
+        battery REAL,
+        status TEXT,
+        FOREIGN KEY (runId) REFERENCES runs (id)
+    );
+    -- Serves the /logs query (WHERE runId ORDER BY t, droneId) straight from the index
+    CREATE INDEX IF NOT EXISTS idx_samples_run_t
+    ON samples (runId, t, droneId);
+'''
+
+# One constant statement so sqlite3's statement cache always hits. Columns are
+# ordered so a row is the two labels, the logged state columns, t and status.
+INSERT_SAMPLE_SQL = '''
+    INSERT INTO samples (runId, droneId, x, y, z, vx, vy, vz, battery, t, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Keys of the state dicts returned to the API, in SwarmArrays column order
+STATE_KEYS = ('id', 'x', 'y', 'z', 'vx', 'vy', 'vz', 'battery', 'status')
+_state_fields = attrgetter(*STATE_KEYS[:-1])
+
+@lru_cache(maxsize=32)
+def _formation_positions(formation: str, count: int, params: Tuple[Tuple[str, Any], ...]) -> np.ndarray:
+    """Formation positions for count drones as a read-only (N, 3) array, cached on (formation, count, params)"""
+    parameters = dict(params)
+    i = np.arange(count)
+    height = parameters.get("height", 0.6)
+    
+    if formation == "line":
+        spacing = parameters.get("spacing", 0.5)
+        xs = (i - (count-1)/2) * spacing
+        ys = np.zeros(count)
+        height = 0.6
+    
+    elif formation == "circle":
+        radius = parameters.get("radius", 1.0)
+        angles = np.linspace(0, 2 * np.pi, count, endpoint=False)
+        xs = radius * np.cos(angles)
+        ys = radius * np.sin(angles)
+    
+    elif formation == "grid":
+        cols = int(math.ceil(math.sqrt(count)))
+        spacing = parameters.get("spacing", 0.5)
+        row, col = np.divmod(i, max(cols, 1))
+        xs = (col - (cols-1)/2) * spacing
+        ys = (row - (count//max(cols, 1)-1)/2) * spacing
+    
+    elif formation == "vshape":
+        spacing = parameters.get("spacing", 0.5)
+        # Leader at the origin, then alternating sides one row back each pair
+        row = (i + 1) // 2
+        side = np.where(i % 2 == 1, 1, -1)
+        xs = row * spacing
+        ys = side * row * spacing * 0.5
+    
+    else:
+        xs = ys = np.empty(0)
+    
+    positions = np.column_stack((xs, ys, np.full(len(xs), height, dtype=float)))
+    # Shared between callers through the cache
+    positions.flags.writeable = False
+    return positions
 
 class DroneSimulator:
-    def __init__(self):
+    def __init__(self, db_path: str = 'swarm_logs.db'):
         self.drones: Dict[str, DroneState] = {}
+        self._arrays = SwarmArrays()
+        # Views dropped by reset(), handed out again by create_swarm
+        self._free_views: List[DroneState] = []
         self.running = False
         self.tick_rate = 20  # 20 Hz
         self.dt = 1.0 / self.tick_rate
+        self.tick_count = 0  # ticks run since the simulator was created
         self.safety_radius = 0.3
         self.max_speed = 1.0
         self.max_height = 1.0
@@ -55,220 +293,279 @@ class DroneSimulator:
         # Noise parameters
         self.position_noise_std = 0.01
         self.velocity_noise_std = 0.005
+        self._rng = np.random.default_rng()
+        self._noise_scale = np.array([self.position_noise_std] * 3 +
+                                     [self.velocity_noise_std] * 3)
+        self._noise = np.empty((0, 6))  # reused per-tick noise buffer
         
         self._task = None
+        self._writer_task = None
+        
+        # Tick snapshots waiting for the background writer. Bounded so a
+        # writer that can't keep up (or a failing database) can't grow it
+        # forever; the oldest tick is dropped when it is full.
+        self.log_queue_size = 100  # ticks, 20s of telemetry at the default stride
+        self._log_queue: asyncio.Queue = asyncio.Queue(maxsize=self.log_queue_size)
+        self.log_flush_interval = 0.2  # seconds between database writes
+        self.log_stride = 4  # default: log every Nth tick, 5 Hz at the 20 Hz tick rate
+        self._run_log_stride = self.log_stride  # stride of the current run, set by create_swarm
+        self.log_epsilon = 0.05  # minimum position/velocity change before a drone is logged again
+        # Every Nth sample logs all drones whatever changed, so readers never
+        # have to bridge more than this gap (5s at the default 5 Hz)
+        self.log_keyframe_interval = 25
+        self._log_count = 0  # samples taken, for the keyframe schedule
+        
+        # Persistent connection for every database write; autocommit mode,
+        # multi-statement writes use an explicit transaction under _db_lock
+        self._db_lock = asyncio.Lock()
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        # WAL makes commits append-only and synchronous=NORMAL drops the fsync
+        # per commit. A power loss can lose the last few ticks, which is an
+        # acceptable trade for telemetry.
+        self._conn.executescript('''
+            PRAGMA busy_timeout=5000;
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-65536;
+        ''')
+        self._conn.executescript(LOG_SCHEMA_SQL)
 
     async def start(self):
         """Start the simulation loop"""
         self.running = True
         self._task = asyncio.create_task(self._simulation_loop())
+        self._writer_task = asyncio.create_task(self._writer_loop())
 
     async def stop(self):
         """Stop the simulation loop"""
         self.running = False
         if self._task:
             await self._task
+        if self._writer_task:
+            # The writer flushes whatever is still queued before it exits
+            await self._writer_task
+        self._conn.close()
 
     async def _simulation_loop(self):
         """Main simulation loop running at 20Hz"""
+        next_tick = time.monotonic()
         while self.running:
-            start_time = time.time()
-            
             # Update all drones
             await self._update_drones()
             
-            # Log current states
-            await self._log_states()
+            # Log current states; control runs every tick, telemetry only
+            # needs every log_stride-th
+            if self.tick_count % self._run_log_stride == 0:
+                self._log_states()
+            self.tick_count += 1
             
-            # Sleep to maintain tick rate
-            elapsed = time.time() - start_time
-            sleep_time = max(0, self.dt - elapsed)
-            await asyncio.sleep(sleep_time)
+            # Sleep until the next fixed deadline so the tick rate doesn't
+            # drift; the monotonic clock is immune to wall-clock adjustments
+            next_tick += self.dt
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Tick overran its slot; restart the schedule from now instead
+                # of bursting to catch up
+                next_tick -= delay
+                delay = 0
+            await asyncio.sleep(delay)
 
     async def _update_drones(self):
         """Update physics for all drones"""
         current_time = time.time()
+        arrays = self._arrays
+        n = arrays.size
+        if n == 0:
+            return
         
-        for drone in self.drones.values():
-            # Update battery
-            drone.battery = max(0, drone.battery - self.battery_drain_rate * self.dt)
-            
-            # Handle different states
-            if drone.status == DroneStatus.TAKING_OFF:
-                await self._update_takeoff(drone, current_time)
-            elif drone.status == DroneStatus.FLYING:
-                await self._update_flying(drone, current_time)
-            elif drone.status == DroneStatus.LANDING:
-                await self._update_landing(drone, current_time)
-            
-            # Apply noise to sensors
-            drone.x += random.gauss(0, self.position_noise_std)
-            drone.y += random.gauss(0, self.position_noise_std)
-            drone.z += random.gauss(0, self.position_noise_std)
-            drone.vx += random.gauss(0, self.velocity_noise_std)
-            drone.vy += random.gauss(0, self.velocity_noise_std)
-            drone.vz += random.gauss(0, self.velocity_noise_std)
-            
-            # Check for errors
-            if drone.battery <= 0:
-                drone.status = DroneStatus.ERROR
-            elif (abs(drone.x) > self.workspace_bounds or 
-                  abs(drone.y) > self.workspace_bounds or 
-                  drone.z > self.max_height):
-                drone.status = DroneStatus.ERROR
-            
-            drone.last_update = current_time
-
-    async def _update_takeoff(self, drone: DroneState, current_time: float):
-        """Update drone during takeoff phase"""
-        elapsed = current_time - drone.takeoff_start
+        pos = arrays.pos[:n]
+        vel = arrays.vel[:n]
         
-        if elapsed >= drone.takeoff_duration:
-            # Takeoff complete
-            drone.z = drone.takeoff_height
-            drone.vz = 0.0
-            drone.status = DroneStatus.FLYING
-        else:
-            # Smooth takeoff with acceleration
-            progress = elapsed / drone.takeoff_duration
-            target_z = drone.takeoff_height * progress
-            
-            # Simple PID-like control
-            error = target_z - drone.z
-            drone.vz = min(self.max_speed, max(-self.max_speed, error * 2.0))
-            drone.z += drone.vz * self.dt
-
-    async def _update_flying(self, drone: DroneState, current_time: float):
-        """Update drone during flight"""
-        # Move towards target position
-        dx = drone.target_x - drone.x
-        dy = drone.target_y - drone.y
-        dz = drone.target_z - drone.z
-        
-        distance = math.sqrt(dx**2 + dy**2 + dz**2)
-        
-        if distance > 0.05:  # 5cm threshold
-            # Normalize direction and apply speed limit
-            speed_factor = min(1.0, distance / 0.1)  # Slow down when close
-            target_speed = self.max_speed * speed_factor
-            
-            drone.vx = (dx / distance) * target_speed
-            drone.vy = (dy / distance) * target_speed
-            drone.vz = (dz / distance) * target_speed
-            
-            # Update position
-            drone.x += drone.vx * self.dt
-            drone.y += drone.vy * self.dt
-            drone.z += drone.vz * self.dt
-        else:
-            # Close enough to target
-            drone.vx = 0.0
-            drone.vy = 0.0
-            drone.vz = 0.0
-
-    async def _update_landing(self, drone: DroneState, current_time: float):
-        """Update drone during landing"""
-        # Move towards ground
-        target_z = 0.0
-        dz = target_z - drone.z
-        
-        if abs(dz) > 0.05:
-            drone.vz = min(self.max_speed, max(-self.max_speed, dz * 2.0))
-            drone.z += drone.vz * self.dt
-        else:
-            # Landing complete
-            drone.z = 0.0
-            drone.vz = 0.0
-            drone.status = DroneStatus.IDLE
-
-    async def _log_states(self):
-        """Log current states to database"""
-        if not self.drones:
+        # Battery and state handling for every drone in one compiled pass
+        self._step(arrays, np.arange(n), current_time, self.battery_drain_rate * self.dt)
+        
+        # Apply noise to sensors, drawn for the whole swarm in one call
+        if len(self._noise) != n:
+            self._noise = np.empty((n, 6))
+        noise = self._rng.standard_normal(out=self._noise)
+        noise *= self._noise_scale
+        pos += noise[:, :3]
+        vel += noise[:, 3:]
+        
+        # Check for errors
+        physics.flag_errors(arrays.pos, arrays.battery, arrays.status, n,
+                            self.workspace_bounds, self.max_height)
+        
+        arrays.last_update[:n] = current_time
+
+    def _step(self, arrays: SwarmArrays, rows: np.ndarray, current_time: float, drain: float):
+        """Run the physics step for the drones at the given rows"""
+        physics.step(arrays.pos, arrays.vel, arrays.target, arrays.status, arrays.battery,
+                     arrays.takeoff_height, arrays.takeoff_start, arrays.takeoff_duration,
+                     rows, current_time, self.dt, self.max_speed, drain)
+
+    def _log_states(self):
+        """Queue the states that changed since they were last logged"""
+        arrays = self._arrays
+        n = arrays.size
+        if n == 0:
             return
         
-        conn = sqlite3.connect('swarm_logs.db')
-        cursor = conn.cursor()
+        # Hovering or idle drones only drift by sensor noise, so skip them
+        # until their position or velocity moves by more than log_epsilon.
+        # Battery drains steadily and would trip the threshold every few
+        # ticks, so it is logged along with the other fields but never
+        # triggers a row on its own; keyframes bring it up to date.
+        keyframe = self._log_count % self.log_keyframe_interval == 0
+        self._log_count += 1
+        current = np.hstack((arrays.pos[:n], arrays.vel[:n], arrays.battery[:n, None]))
+        codes = arrays.status[:n]
+        logged = arrays.logged[:n]
+        logged_status = arrays.logged_status[:n]
+        changed = ((np.abs(current[:, :6] - logged[:, :6]) > self.log_epsilon).any(axis=1) |
+                   (codes != logged_status) | keyframe)
+        if not changed.any():
+            return
+        logged[changed] = current[changed]
+        logged_status[changed] = codes[changed]
         
         current_time = time.time()
         
-        for drone in self.drones.values():
-            cursor.execute('''
-                INSERT INTO samples (runId, droneId, t, x, y, z, vx, vy, vz, battery, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                getattr(drone, 'run_id', 'default'),
-                drone.id,
-                current_time,
-                drone.x,
-                drone.y,
-                drone.z,
-                drone.vx,
-                drone.vy,
-                drone.vz,
-                drone.battery,
-                drone.status.value
-            ))
-        
-        conn.commit()
-        conn.close()
-
-    async def create_swarm(self, count: int, run_id: str) -> List[str]:
-        """Create a new swarm of drones"""
-        drone_ids = []
-        
-        for i in range(count):
-            drone_id = f"d{i+1}"
-            drone = DroneState(id=drone_id)
-            drone.run_id = run_id
-            self.drones[drone_id] = drone
-            drone_ids.append(drone_id)
+        # Build rows column-wise: tolist() boxes each column in one C loop
+        rows_idx = np.flatnonzero(changed)
+        if len(rows_idx) == n:
+            run_ids, ids = arrays.run_ids, arrays.ids
+        else:
+            picked = rows_idx.tolist()
+            run_ids = [arrays.run_ids[i] for i in picked]
+            ids = [arrays.ids[i] for i in picked]
+        columns = current[rows_idx].T.tolist()
+        statuses = [STATUS_VALUES[code] for code in codes[rows_idx].tolist()]
+        rows = list(zip(run_ids, ids, *columns, repeat(current_time), statuses))
+        if self._log_queue.full():
+            self._log_queue.get_nowait()
+        self._log_queue.put_nowait(rows)
+
+    async def _writer_loop(self):
+        """Write queued states to the database every log_flush_interval"""
+        while self.running:
+            await asyncio.sleep(self.log_flush_interval)
+            await self._write_log_queue()
+        await self._write_log_queue()
+
+    async def _write_log_queue(self):
+        """Flush the log queue; on a database error, log it and drop the batch"""
+        async with self._db_lock:
+            # The queue is drained here, on the loop; only the insert runs
+            # in a worker thread so the tick loop keeps going meanwhile
+            rows = []
+            while not self._log_queue.empty():
+                rows.extend(self._log_queue.get_nowait())
+            if not rows:
+                return
+            try:
+                await asyncio.to_thread(self._flush_log_queue, rows)
+            except Exception:
+                # Keep the writer alive; the queue bound limits what piles up
+                logger.exception("Failed to write telemetry samples, dropping them")
+
+    def _flush_log_queue(self, rows):
+        """Insert the drained ticks in a single transaction"""
+        # One transaction (and one journal sync) for several ticks
+        self._conn.execute('BEGIN')
+        try:
+            self._conn.executemany(INSERT_SAMPLE_SQL, rows)
+            self._conn.execute('COMMIT')
+        except Exception:
+            # A failed COMMIT can leave the transaction open, which would
+            # make every later BEGIN fail too
+            if self._conn.in_transaction:
+                self._conn.execute('ROLLBACK')
+            raise
+
+    async def create_swarm(self, count: int, run_id: str, log_stride: Optional[int] = None) -> List[str]:
+        """Create a new swarm of drones, optionally with its own log stride for the run"""
+        # Runs without a stride of their own go back to the default
+        if log_stride is None:
+            self._run_log_stride = self.log_stride
+        else:
+            # Accept positive ints and their decimal strings only; floats
+            # and bools are rejected rather than truncated
+            stride = log_stride
+            if isinstance(stride, str) and stride.isdecimal():
+                stride = int(stride)
+            if not (isinstance(stride, int) and not isinstance(stride, bool) and stride >= 1):
+                raise ValueError(f"log_stride must be a positive integer, got {log_stride!r}")
+            self._run_log_stride = stride
+        
+        drone_ids = [f"d{i+1}" for i in range(count)]
+        arrays = self._arrays
+        
+        # New drones get their rows in one block; recreated drones reuse theirs
+        new_ids = [drone_id for drone_id in drone_ids if drone_id not in self.drones]
+        new_rows = dict(zip(new_ids, arrays.add_many(new_ids, run_id)))
+        
+        free_views = self._free_views
+        for drone_id in drone_ids:
+            index = new_rows.get(drone_id)
+            if index is None:
+                # The existing view already points at the reset row
+                index = self.drones[drone_id]._index
+                arrays.reset_row(index)
+                arrays.run_ids[index] = run_id
+            elif free_views:
+                view = free_views.pop()
+                view._index = index
+                self.drones[drone_id] = view
+            else:
+                self.drones[drone_id] = DroneState(id=drone_id, run_id=run_id, arrays=arrays, index=index)
         
         # Log the run
-        conn = sqlite3.connect('swarm_logs.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO runs (id, name, startedAt, status)
-            VALUES (?, ?, ?, ?)
-        ''', (run_id, f"Swarm of {count} drones", datetime.now().isoformat(), "running"))
-        conn.commit()
-        conn.close()
+        async with self._db_lock:
+            self._run_insert(run_id, f"Swarm of {count} drones")
         
         return drone_ids
 
     async def get_all_states(self) -> Dict[str, Any]:
         """Get current states of all drones"""
+        arrays = self._arrays
+        n = arrays.size
+        # One tolist() per snapshot instead of nine attribute reads per drone
+        rows = np.hstack((arrays.pos[:n], arrays.vel[:n], arrays.battery[:n, None])).tolist()
+        codes = arrays.status[:n].tolist()
         return {
-            drone_id: {
-                "id": drone.id,
-                "x": drone.x,
-                "y": drone.y,
-                "z": drone.z,
-                "vx": drone.vx,
-                "vy": drone.vy,
-                "vz": drone.vz,
-                "battery": drone.battery,
-                "status": drone.status.value
-            }
+            drone_id: dict(zip(STATE_KEYS, (drone.id, *rows[drone._index],
+                                            STATUS_VALUES[codes[drone._index]])))
             for drone_id, drone in self.drones.items()
         }
 
+    async def get_state_frame(self) -> bytes:
+        """Get current states of all drones packed into one binary frame
+        
+        Little-endian FRAME_HEADER (tick, drone count n, time), then an
+        (n, 7) float32 block of x, y, z, vx, vy, vz, battery and n uint8
+        status codes. The frame carries no ids: row i is the i-th drone of
+        get_all_states (and /drones), since rows are handed out in the order
+        drones are added to self.drones and are only freed by reset().
+        """
+        arrays = self._arrays
+        n = arrays.size
+        block = np.empty((n, 7), dtype='<f4')
+        block[:, :3] = arrays.pos[:n]
+        block[:, 3:6] = arrays.vel[:n]
+        block[:, 6] = arrays.battery[:n]
+        return b''.join((FRAME_HEADER.pack(self.tick_count, n, time.time()),
+                         block.tobytes(), arrays.status[:n].tobytes()))
+
     async def get_drone_state(self, drone_id: str) -> Optional[Dict[str, Any]]:
         """Get state of a specific drone"""
         if drone_id not in self.drones:
             return None
         
         drone = self.drones[drone_id]
-        return {
-            "id": drone.id,
-            "x": drone.x,
-            "y": drone.y,
-            "z": drone.z,
-            "vx": drone.vx,
-            "vy": drone.vy,
-            "vz": drone.vz,
-            "battery": drone.battery,
-            "status": drone.status.value
-        }
+        return dict(zip(STATE_KEYS, (*_state_fields(drone), drone.status_value)))
 
     async def takeoff(self, drone_id: str, height: float, duration: float) -> bool:
         """Command drone to takeoff"""
@@ -276,10 +573,10 @@ class DroneSimulator:
             return False
         
         drone = self.drones[drone_id]
-        if drone.status != DroneStatus.IDLE:
+        if drone.status_code != physics.IDLE:
             return False
         
-        drone.status = DroneStatus.TAKING_OFF
+        drone.status_code = physics.TAKING_OFF
         drone.takeoff_height = height
         drone.takeoff_duration = duration
         drone.takeoff_start = time.time()
@@ -288,18 +585,29 @@ class DroneSimulator:
 
     async def goto(self, drone_id: str, x: float, y: float, z: float, speed: float) -> bool:
         """Command drone to move to position"""
-        if drone_id not in self.drones:
-            return False
-        
-        drone = self.drones[drone_id]
-        if drone.status not in [DroneStatus.FLYING, DroneStatus.TAKING_OFF]:
-            return False
-        
-        drone.target_x = x
-        drone.target_y = y
-        drone.target_z = z
-        
-        return True
+        return (await self.goto_many([drone_id], [(x, y, z)]))[0]
+
+    async def goto_many(self, drone_ids: List[str], targets) -> List[bool]:
+        """Command several drones to move, targets given as an (N, 3) array-like
+        
+        Returns whether each drone accepted its target; as with goto, only
+        known drones that are flying or taking off do.
+        """
+        drones = self.drones
+        arrays = self._arrays
+        
+        # Unknown ids get row -1 and are never accepted
+        rows = np.array([drones[drone_id]._index if drone_id in drones else -1
+                         for drone_id in drone_ids], dtype=np.intp)
+        accepted = rows >= 0
+        codes = arrays.status[rows[accepted]]
+        accepted[accepted] = (codes == physics.FLYING) | (codes == physics.TAKING_OFF)
+        
+        # One fancy-indexed write for all accepted targets
+        targets = np.asarray(targets, dtype=np.float64).reshape(-1, 3)
+        arrays.target[rows[accepted]] = targets[accepted]
+        
+        return accepted.tolist()
 
     async def land(self, drone_id: str) -> bool:
         """Command drone to land"""
@@ -307,74 +615,37 @@ class DroneSimulator:
             return False
         
         drone = self.drones[drone_id]
-        if drone.status not in [DroneStatus.FLYING, DroneStatus.TAKING_OFF]:
+        if drone.status_code not in (physics.FLYING, physics.TAKING_OFF):
             return False
         
-        drone.status = DroneStatus.LANDING
+        drone.status_code = physics.LANDING
         drone.land_start = time.time()
         
         return True
 
     async def set_formation(self, formation: str, parameters: Dict[str, Any]) -> bool:
         """Set formation for all flying drones"""
-        flying_drones = [d for d in self.drones.values() if d.status == DroneStatus.FLYING]
+        arrays = self._arrays
+        flying = np.flatnonzero(arrays.status[:arrays.size] == physics.FLYING)
         
-        if not flying_drones:
+        if len(flying) == 0:
             return False
         
-        positions = self._calculate_formation_positions(formation, len(flying_drones), parameters)
+        positions = self._calculate_formation_positions(formation, len(flying), parameters)
         
-        for i, drone in enumerate(flying_drones):
-            if i < len(positions):
-                drone.target_x = positions[i][0]
-                drone.target_y = positions[i][1]
-                drone.target_z = positions[i][2]
+        # Rows are in creation order, so this matches iterating self.drones
+        arrays.target[flying[:len(positions)]] = positions
         
         return True
 
-    def _calculate_formation_positions(self, formation: str, count: int, parameters: Dict[str, Any]) -> List[Tuple[float, float, float]]:
-        """Calculate positions for different formations"""
-        positions = []
-        
-        if formation == "line":
-            spacing = parameters.get("spacing", 0.5)
-            for i in range(count):
-                x = (i - (count-1)/2) * spacing
-                positions.append((x, 0.0, 0.6))
-        
-        elif formation == "circle":
-            radius = parameters.get("radius", 1.0)
-            height = parameters.get("height", 0.6)
-            for i in range(count):
-                angle = 2 * math.pi * i / count
-                x = radius * math.cos(angle)
-                y = radius * math.sin(angle)
-                positions.append((x, y, height))
-        
-        elif formation == "grid":
-            cols = int(math.ceil(math.sqrt(count)))
-            spacing = parameters.get("spacing", 0.5)
-            height = parameters.get("height", 0.6)
-            for i in range(count):
-                row = i // cols
-                col = i % cols
-                x = (col - (cols-1)/2) * spacing
-                y = (row - (count//cols-1)/2) * spacing
-                positions.append((x, y, height))
-        
-        elif formation == "vshape":
-            spacing = parameters.get("spacing", 0.5)
-            height = parameters.get("height", 0.6)
-            for i in range(count):
-                if i == 0:
-                    positions.append((0.0, 0.0, height))
-                else:
-                    side = 1 if i % 2 == 1 else -1
-                    row = (i + 1) // 2
-                    x = row * spacing
-                    y = side * row * spacing * 0.5
-                    positions.append((x, y, height))
-        
+    def _calculate_formation_positions(self, formation: str, count: int, parameters: Dict[str, Any]) -> np.ndarray:
+        """Calculate positions for different formations as an (N, 3) array"""
+        key = tuple(sorted(parameters.items()))
+        try:
+            positions = _formation_positions(formation, count, key)
+        except TypeError:
+            # Unhashable parameter values, compute without the cache
+            positions = _formation_positions.__wrapped__(formation, count, key)
         return positions
 
     async def run_experiment(self, scenario: str, num_drones: int, duration: int, parameters: Dict[str, Any]) -> Dict[str, Any]:
@@ -395,7 +666,7 @@ class DroneSimulator:
         
         # Create swarm
         run_id = f"circular_{int(time.time())}"
-        drone_ids = await self.create_swarm(num_drones, run_id)
+        drone_ids = await self.create_swarm(num_drones, run_id, parameters.get("log_stride"))
         
         # Takeoff all drones
         for drone_id in drone_ids:
@@ -427,27 +698,35 @@ class DroneSimulator:
             return {"error": "Need at least 1 drone for figure-8"}
         
         run_id = f"figure8_{int(time.time())}"
-        drone_ids = await self.create_swarm(num_drones, run_id)
+        drone_ids = await self.create_swarm(num_drones, run_id, parameters.get("log_stride"))
         
         # Takeoff first drone
         await self.takeoff(drone_ids[0], 0.6, 2.0)
         await asyncio.sleep(3)
         
-        # Simple figure-8 waypoints
-        waypoints = [
-            (0.0, 0.0, 0.6),
-            (1.0, 0.5, 0.6),
-            (0.0, 1.0, 0.6),
-            (-1.0, 0.5, 0.6),
-            (0.0, 0.0, 0.6)
-        ]
-        
-        for waypoint in waypoints:
-            await self.goto(drone_ids[0], waypoint[0], waypoint[1], waypoint[2], 0.5)
-            await asyncio.sleep(duration / len(waypoints))
+        # Figure-8 (x = A sin t, y = B sin 2t), one target per physics tick
+        # taken from the elapsed time, so a late tick catches up instead of
+        # stretching the run
+        width = parameters.get("width", 1.0)
+        drone_id = drone_ids[0]
+        start = time.monotonic()
+        next_tick = start
+        while True:
+            elapsed = time.monotonic() - start
+            if elapsed >= duration:
+                break
+            # The swarm can be replaced mid-run (reusing the same ids); stop
+            # once the drone is gone or belongs to another run
+            drone = self.drones.get(drone_id)
+            if drone is None or drone.run_id != run_id:
+                break
+            t = 2 * math.pi * elapsed / duration
+            self._arrays.target[drone._index] = (width * math.sin(t), width / 2 * math.sin(2 * t), 0.6)
+            next_tick += self.dt
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
         
         # Land
-        await self.land(drone_ids[0])
+        await self.land(drone_id)
         
         return {
             "scenario": "figure_eight",
@@ -461,7 +740,7 @@ class DroneSimulator:
         height = parameters.get("height", 0.6)
         
         run_id = f"hover_{int(time.time())}"
-        drone_ids = await self.create_swarm(num_drones, run_id)
+        drone_ids = await self.create_swarm(num_drones, run_id, parameters.get("log_stride"))
         
         # Takeoff all
         for drone_id in drone_ids:
@@ -485,20 +764,40 @@ class DroneSimulator:
 
     async def emergency_stop(self):
         """Emergency stop all drones"""
-        for drone in self.drones.values():
-            drone.vx = 0.0
-            drone.vy = 0.0
-            drone.vz = 0.0
-            drone.status = DroneStatus.IDLE
+        # Every row belongs to a drone, so one write per column stops them all
+        n = self._arrays.size
+        self._arrays.vel[:n] = 0.0
+        self._arrays.status[:n] = _IDLE
 
     async def reset(self):
         """Reset simulation state"""
+        # Rows and views are kept for the next swarm rather than reallocated
+        self._free_views.extend(self.drones.values())
         self.drones.clear()
+        self._arrays.clear()
         
-        # Clear database
-        conn = sqlite3.connect('swarm_logs.db')
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM samples')
-        cursor.execute('DELETE FROM runs')
-        conn.commit()
-        conn.close()
+        # Clear database, dropping queued ticks so they aren't written after
+        async with self._db_lock:
+            while not self._log_queue.empty():
+                self._log_queue.get_nowait()
+            self._reset_tables()
+
+    def _run_insert(self, run_id: str, name: str):
+        """Record a new run in the runs table; a run id that already exists is an error"""
+        self._conn.execute('''
+            INSERT INTO runs (id, name, startedAt, status)
+            VALUES (?, ?, ?, ?)
+        ''', (run_id, name, datetime.now().isoformat(), "running"))
+
+    def _reset_tables(self):
+        """Delete all samples and runs in one transaction"""
+        self._conn.execute('BEGIN')
+        try:
+            self._conn.execute('DELETE FROM samples')
+            self._conn.execute('DELETE FROM runs')
+            self._conn.execute('COMMIT')
+        except Exception:
+            # Same as _flush_log_queue: never leave the transaction open
+            if self._conn.in_transaction:
+                self._conn.execute('ROLLBACK')
+            raise
@@ -0,0 +1,171 @@
+"""
+Physics step for the mock simulator.
+
+Works directly on the SwarmArrays columns. The step comes from the Cython
+build in _ticker.pyx when it has been compiled, is JIT-compiled with Numba
+when that is installed, and falls back to masked NumPy operations otherwise,
+so the simulator never needs to know which version it got.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+# Compiled step, only present after `python setup.py build_ext --inplace`
+try:
+    from . import _ticker
+except ImportError:
+    _ticker = None
+
+# Status codes, in DroneStatus declaration order
+IDLE, TAKING_OFF, FLYING, LANDING, ERROR = range(5)
+
+# Drones within 5cm of their target hold position; compared squared so
+# arrived drones skip the sqrt
+ARRIVED_DIST_SQ = 0.05 * 0.05
+
+
+if HAVE_NUMBA:
+    @njit(fastmath=True)
+    def step(pos, vel, target, status, battery,
+             takeoff_height, takeoff_start, takeoff_duration,
+             rows, t, dt, max_speed, drain):
+        """Drain battery and advance each drone in rows by one tick"""
+        for i in rows:
+            # Update battery
+            battery[i] = max(0.0, battery[i] - drain)
+
+            if status[i] == TAKING_OFF:
+                elapsed = t - takeoff_start[i]
+                if elapsed >= takeoff_duration[i]:
+                    # Takeoff complete
+                    pos[i, 2] = takeoff_height[i]
+                    vel[i, 2] = 0.0
+                    status[i] = FLYING
+                else:
+                    # Smooth takeoff, simple PID-like control
+                    target_z = takeoff_height[i] * (elapsed / takeoff_duration[i])
+                    vz = min(max_speed, max(-max_speed, (target_z - pos[i, 2]) * 2.0))
+                    vel[i, 2] = vz
+                    pos[i, 2] += vz * dt
+
+            elif status[i] == FLYING:
+                dx = target[i, 0] - pos[i, 0]
+                dy = target[i, 1] - pos[i, 1]
+                dz = target[i, 2] - pos[i, 2]
+                distance_sq = dx * dx + dy * dy + dz * dz
+                if distance_sq > ARRIVED_DIST_SQ:
+                    # Normalize direction and slow down when close
+                    distance = np.sqrt(distance_sq)
+                    scale = max_speed * min(1.0, distance / 0.1) / distance
+                    vel[i, 0] = dx * scale
+                    vel[i, 1] = dy * scale
+                    vel[i, 2] = dz * scale
+                    pos[i, 0] += vel[i, 0] * dt
+                    pos[i, 1] += vel[i, 1] * dt
+                    pos[i, 2] += vel[i, 2] * dt
+                else:
+                    # Close enough to target
+                    vel[i, 0] = 0.0
+                    vel[i, 1] = 0.0
+                    vel[i, 2] = 0.0
+
+            elif status[i] == LANDING:
+                dz = -pos[i, 2]
+                if abs(dz) > 0.05:
+                    vz = min(max_speed, max(-max_speed, dz * 2.0))
+                    vel[i, 2] = vz
+                    pos[i, 2] += vz * dt
+                else:
+                    # Landing complete
+                    pos[i, 2] = 0.0
+                    vel[i, 2] = 0.0
+                    status[i] = IDLE
+
+    @njit(fastmath=True)
+    def flag_errors(pos, battery, status, n, bounds, max_height):
+        """Set ERROR on the first n drones if out of battery or outside the workspace"""
+        for i in range(n):
+            if (battery[i] <= 0.0 or abs(pos[i, 0]) > bounds or
+                    abs(pos[i, 1]) > bounds or pos[i, 2] > max_height):
+                status[i] = ERROR
+
+    # Compile once at import so the first tick doesn't pay for it. See
+    # algorithms/_kernels.py for why the on-disk cache is left off.
+    flag_errors(np.zeros((1, 3)), np.ones(1), np.zeros(1, dtype=np.int8), 1, 2.0, 1.0)
+    step(np.zeros((1, 3)), np.zeros((1, 3)), np.zeros((1, 3)),
+         np.zeros(1, dtype=np.int8), np.zeros(1), np.zeros(1), np.zeros(1),
+         np.zeros(1), np.zeros(1, dtype=np.intp), 0.0, 0.05, 1.0, 0.0)
+
+else:
+    def step(pos, vel, target, status, battery,
+             takeoff_height, takeoff_start, takeoff_duration,
+             rows, t, dt, max_speed, drain):
+        """Drain battery and advance each drone in rows by one tick"""
+        # Update battery
+        battery[rows] = np.maximum(battery[rows] - drain, 0.0)
+
+        # Masks are taken up front so a drone that changes status this tick
+        # isn't advanced twice
+        codes = status[rows]
+        taking_off = rows[codes == TAKING_OFF]
+        flying = rows[codes == FLYING]
+        landing = rows[codes == LANDING]
+
+        # Takeoff
+        elapsed = t - takeoff_start[taking_off]
+        done = elapsed >= takeoff_duration[taking_off]
+        finished = taking_off[done]
+        pos[finished, 2] = takeoff_height[finished]
+        vel[finished, 2] = 0.0
+        status[finished] = FLYING
+
+        climbing = taking_off[~done]
+        target_z = takeoff_height[climbing] * (elapsed[~done] / takeoff_duration[climbing])
+        vz = np.clip((target_z - pos[climbing, 2]) * 2.0, -max_speed, max_speed)
+        vel[climbing, 2] = vz
+        pos[climbing, 2] += vz * dt
+
+        # Flying
+        delta = target[flying] - pos[flying]
+        distance_sq = np.einsum('ij,ij->i', delta, delta)
+        moving = distance_sq > ARRIVED_DIST_SQ
+        m = flying[moving]
+        d = np.sqrt(distance_sq[moving])
+        velocity = delta[moving] * (max_speed * np.minimum(1.0, d / 0.1) / d)[:, None]
+        vel[m] = velocity
+        pos[m] += velocity * dt
+        vel[flying[~moving]] = 0.0
+
+        # Landing
+        dz = -pos[landing, 2]
+        descending = np.abs(dz) > 0.05
+        d = landing[descending]
+        vz = np.clip(dz[descending] * 2.0, -max_speed, max_speed)
+        vel[d, 2] = vz
+        pos[d, 2] += vz * dt
+
+        landed = landing[~descending]
+        pos[landed, 2] = 0.0
+        vel[landed, 2] = 0.0
+        status[landed] = IDLE
+
+    def flag_errors(pos, battery, status, n, bounds, max_height):
+        """Set ERROR on the first n drones if out of battery or outside the workspace"""
+        pos = pos[:n]
+        error = ((battery[:n] <= 0) |
+                 (np.abs(pos[:, :2]) > bounds).any(axis=1) |
+                 (pos[:, 2] > max_height))
+        status[:n][error] = ERROR
+
+# The Numba/NumPy versions stay reachable as the reference the Cython build
+# is tested against
+_reference_step = step
+_reference_flag_errors = flag_errors
+
+if _ticker is not None:
+    step = _ticker.step
+    flag_errors = _ticker.flag_errors
@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.simulators.mock_simulator import DroneSimulator
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One event loop for the whole test session instead of one per test"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def fast_time(monkeypatch):
+    """Replace time.time with a manual clock; tests advance it via fast_time[0]"""
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def simulator(tmp_path):
+    """DroneSimulator logging to a database in the test's temp directory"""
+    sim = DroneSimulator(db_path=str(tmp_path / "swarm_logs.db"))
+    yield sim
+    sim._conn.close()
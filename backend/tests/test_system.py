@@ -1,9 +1,13 @@
 import pytest
 import asyncio
 import time
+import sqlite3
+import struct
+from pathlib import Path
+import numpy as np
 from unittest.mock import Mock, patch
 from backend.algorithms.trajectory_planner import SimpleCollisionAvoidance
-from backend.simulators.mock_simulator import DroneSimulator, DroneState, DroneStatus
+from backend.simulators.mock_simulator import DroneSimulator, DroneState, DroneStatus, SwarmArrays
 
 class TestSimpleCollisionAvoidance:
     """Test cases for the SimpleCollisionAvoidance trajectory planner"""
@@ -43,6 +47,22 @@ class TestSimpleCollisionAvoidance:
             distance = (dx**2 + dy**2 + dz**2)**0.5
             assert distance >= self.planner.safety_radius
     
+    def test_obstacle_extra_fields_ignored(self):
+        """Test an obstacle given with extra fields is planned around by its x, y, z"""
+        start = [0.0, 0.0, 0.5]
+        goal = [2.0, 0.0, 0.5]
+
+        path = self.planner.plan_path(start, goal, [[1.0, 0.0, 0.5, 0.2]])
+
+        assert path == self.planner.plan_path(start, goal, [[1.0, 0.0, 0.5]])
+
+        # The general planner and validation read x, y, z the same way
+        obstacles = [[1.0, 0.0, 0.5, 0.2], [2.0, 0.0, 0.5, 0.2], [1.5, 0.1, 0.5, 0.2]]
+        xyz = [obstacle[:3] for obstacle in obstacles]
+        path = self.planner.plan_path(start, [3.0, 0.0, 0.5], obstacles)
+        assert path == self.planner.plan_path(start, [3.0, 0.0, 0.5], xyz)
+        assert self.planner.validate_path(path, obstacles) == self.planner.validate_path(path, xyz)
+
     def test_multiple_obstacles(self):
         """Test planning around multiple obstacles"""
         start = [0.0, 0.0, 0.5]
@@ -55,6 +75,79 @@ class TestSimpleCollisionAvoidance:
         assert path[0] == (0.0, 0.0, 0.5)
         assert path[-1] == (3.0, 0.0, 0.5)
     
+    def test_repeated_plan_is_cached(self):
+        """Test that planning the same scenario twice reuses the cached path"""
+        start = [0.0, 0.0, 0.5]
+        goal = [3.0, 0.0, 0.5]
+        obstacles = [[1.0, 0.0, 0.5], [2.0, 0.0, 0.5]]
+        
+        first = self.planner.plan_path(start, goal, obstacles)
+        second = self.planner.plan_path(start, goal, obstacles)
+        
+        assert second == first
+        assert second is not first  # callers get their own copy
+        assert len(self.planner._cache) == 1
+    
+    def test_shortcut_drops_unneeded_waypoints(self):
+        """Test path smoothing skips waypoints a clear segment can bypass"""
+        path = [(0.0, 0.0, 0.5), (1.0, 1.0, 0.5), (2.0, 1.0, 0.5), (3.0, 0.0, 0.5)]
+        obstacles = self.planner._as_obstacle_array([[1.5, 0.0, 0.5]])
+
+        smoothed = self.planner._shortcut_path(path, obstacles)
+
+        # start-goal is blocked, so the detour is kept with one waypoint less
+        assert smoothed == [(0.0, 0.0, 0.5), (2.0, 1.0, 0.5), (3.0, 0.0, 0.5)]
+        assert self.planner.validate_path(smoothed, [[1.5, 0.0, 0.5]])["valid"] == True
+
+    def test_detour_kernel_matches_planner(self):
+        """Test the compiled detour search finds the same waypoints as _find_detour_path"""
+        pytest.importorskip("numba")
+        from backend.algorithms._kernels import detour_path
+        from backend.algorithms.trajectory_planner import MAX_DETOUR_DEPTH
+
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            start = np.array([-1.5, rng.uniform(-0.5, 0.5), 0.5])
+            goal = np.array([1.5, rng.uniform(-0.5, 0.5), 0.5])
+            # Obstacles scattered around the straight line so most cases detour
+            obstacles = np.column_stack((rng.uniform(-1.2, 1.2, 8),
+                                         rng.uniform(-0.6, 0.6, 8),
+                                         rng.uniform(0.3, 0.7, 8)))
+
+            compiled = detour_path(start, goal, obstacles, self.planner._r2,
+                                   self.planner.safety_radius * 1.5, MAX_DETOUR_DEPTH)
+            if self.planner._is_path_clear(start, goal, obstacles):
+                expected = np.array([start, goal])
+            else:
+                expected = np.array(self.planner._find_detour_path(start, goal, obstacles))
+
+            assert compiled.shape == expected.shape
+            assert np.allclose(compiled, expected)
+
+    def test_geom_helpers_match_python(self, monkeypatch):
+        """Test the Cython geometry helpers agree with the Python implementations"""
+        from backend.algorithms import trajectory_planner
+        geom = trajectory_planner._geom
+        if geom is None:
+            pytest.skip("Cython geometry helpers not built")
+        # The planner only uses its Python distance when the extension is missing
+        monkeypatch.setattr(trajectory_planner, "_geom", None)
+
+        rng = np.random.default_rng(0)
+        cases = [tuple(rng.uniform(-2.0, 2.0, (3, 3))) for _ in range(200)]
+        cases += [
+            ((0.5, 0.5, 0.5), (0.5, 0.5, 0.5), (1.0, 0.0, 0.5)),  # zero-length segment
+            ((0.0, 0.0, 0.5), (2.0, 0.0, 0.5), (1.0, 0.0, 0.5)),  # obstacle on the segment
+            ((0.0, 0.0, 0.0), (0.0, 0.0, 1.0), (0.0, 0.0, 0.5)),  # ... of a vertical segment
+        ]
+        for start, goal, point in cases:
+            start, goal, point = tuple(start), tuple(goal), tuple(point)
+            assert np.isclose(geom.point_to_seg_dist2(*start, *goal, *point),
+                              self.planner._point_to_line_distance_sq(start, goal, point))
+            assert np.allclose(geom.detour_midpoint(*start, *goal, *point,
+                                                    self.planner.safety_radius * 1.5),
+                               self.planner._calculate_detour_midpoint(start, goal, point))
+
     def test_path_validation_success(self):
         """Test path validation for a valid path"""
         path = [(0.0, 0.0, 0.5), (1.0, 0.0, 0.5), (2.0, 0.0, 0.5)]
@@ -108,10 +201,10 @@ class TestSimpleCollisionAvoidance:
 class TestDroneSimulator:
     """Test cases for the DroneSimulator state machine and physics"""
     
-    def setup_method(self):
-        self.simulator = DroneSimulator()
+    @pytest.fixture(autouse=True)
+    def setup_simulator(self, simulator):
+        self.simulator = simulator
     
-    @pytest.mark.asyncio
     async def test_drone_creation(self):
         """Test creating a swarm of drones"""
         run_id = "test_run"
@@ -129,8 +222,11 @@ class TestDroneSimulator:
             assert drone.status == DroneStatus.IDLE
             assert drone.battery == 100.0
             assert drone.x == 0.0 and drone.y == 0.0 and drone.z == 0.0
+        
+        # A run id that is already taken fails instead of overwriting the run
+        with pytest.raises(sqlite3.IntegrityError):
+            await self.simulator.create_swarm(count, run_id)
     
-    @pytest.mark.asyncio
     async def test_takeoff_state_transition(self):
         """Test takeoff state machine transition"""
         run_id = "test_run"
@@ -146,7 +242,6 @@ class TestDroneSimulator:
         assert drone.takeoff_height == 0.6
         assert drone.takeoff_duration == 2.0
     
-    @pytest.mark.asyncio
     async def test_goto_command(self):
         """Test goto command sets target position"""
         run_id = "test_run"
@@ -164,8 +259,22 @@ class TestDroneSimulator:
         assert drone.target_x == 1.0
         assert drone.target_y == 0.5
         assert drone.target_z == 0.6
-    
-    @pytest.mark.asyncio
+
+    async def test_goto_many_command(self):
+        """Test batch goto sets targets of flying drones only"""
+        drone_ids = await self.simulator.create_swarm(3, "test_run")
+        self.simulator.drones["d1"].status = DroneStatus.FLYING
+        self.simulator.drones["d2"].status = DroneStatus.FLYING
+
+        accepted = await self.simulator.goto_many(
+            drone_ids + ["d9"],
+            [[0.5, 0.0, 0.6], [-0.5, 0.0, 0.6], [0.0, 0.5, 0.6], [0.0, 0.0, 0.6]])
+
+        # d3 is idle and d9 doesn't exist
+        assert accepted == [True, True, False, False]
+        assert self.simulator.drones["d2"].target_x == -0.5
+        assert self.simulator.drones["d3"].target_y == 0.0
+
     async def test_land_command(self):
         """Test land command transitions to landing state"""
         run_id = "test_run"
@@ -182,7 +291,6 @@ class TestDroneSimulator:
         
         assert drone.status == DroneStatus.LANDING
     
-    @pytest.mark.asyncio
     async def test_emergency_stop(self):
         """Test emergency stop stops all motion"""
         run_id = "test_run"
@@ -207,7 +315,6 @@ class TestDroneSimulator:
             assert drone.vz == 0.0
             assert drone.status == DroneStatus.IDLE
     
-    @pytest.mark.asyncio
     async def test_battery_drain(self):
         """Test battery drains over time"""
         run_id = "test_run"
@@ -222,8 +329,73 @@ class TestDroneSimulator:
         # Battery should have decreased
         new_battery = self.simulator.drones[drone_id].battery
         assert new_battery < initial_battery
-    
-    @pytest.mark.asyncio
+
+    async def test_delta_logging(self):
+        """Test only drones whose state changed are queued and written, plus keyframes"""
+        run_id = "delta_log_test"
+        await self.simulator.create_swarm(3, run_id)
+        queue = self.simulator._log_queue
+
+        # Every drone is logged on its first tick
+        self.simulator._log_states()
+        assert len(queue.get_nowait()) == 3
+
+        # Nothing changed, nothing queued
+        self.simulator._log_states()
+        assert queue.empty()
+
+        # Battery drain alone doesn't queue a row
+        self.simulator.drones["d1"].battery -= 1.0
+        self.simulator._log_states()
+        assert queue.empty()
+
+        # A status change queues just that drone
+        self.simulator.drones["d2"].status = DroneStatus.ERROR
+        self.simulator._log_states()
+        assert queue.qsize() == 1
+
+        # Flushing writes that one row
+        conn = self.simulator._conn
+        count_sql = 'SELECT COUNT(*) FROM samples WHERE runId = ?'
+        before = conn.execute(count_sql, (run_id,)).fetchone()[0]
+        await self.simulator._write_log_queue()
+        after = conn.execute(count_sql, (run_id,)).fetchone()[0]
+        assert queue.empty()
+        assert after - before == 1
+        assert conn.execute('SELECT droneId, status FROM samples WHERE runId = ? ORDER BY rowid DESC',
+                            (run_id,)).fetchone() == ("d2", "error")
+
+        # A keyframe logs every drone, changed or not
+        self.simulator._log_count = self.simulator.log_keyframe_interval
+        self.simulator._log_states()
+        assert len(queue.get_nowait()) == 3
+
+    async def test_log_stride_per_run(self):
+        """Test a run's log stride gates logging and doesn't outlive the run"""
+        await self.simulator.create_swarm(2, "test_run", log_stride=3)
+        logged_ticks = []
+        self.simulator._log_states = lambda: logged_ticks.append(self.simulator.tick_count)
+
+        async def stop_after_nine_ticks(delay):
+            if self.simulator.tick_count >= 9:
+                self.simulator.running = False
+
+        self.simulator.running = True
+        with patch('asyncio.sleep', stop_after_nine_ticks):
+            await self.simulator._simulation_loop()
+        assert logged_ticks == [0, 3, 6]
+
+        # The next run without a stride of its own is back to the default
+        await self.simulator.create_swarm(2, "test_run_2")
+        assert self.simulator._run_log_stride == self.simulator.log_stride
+
+        await self.simulator.create_swarm(2, "test_run_3", log_stride="5")
+        assert self.simulator._run_log_stride == 5
+
+        for bad in (0, -1, 2.7, 3.0, float("inf"), float("nan"), True, False, "abc", "-2"):
+            with pytest.raises(ValueError):
+                await self.simulator.create_swarm(2, "test_run", log_stride=bad)
+
     async def test_bounds_checking(self):
         """Test workspace bounds enforcement"""
         run_id = "test_run"
@@ -240,8 +412,82 @@ class TestDroneSimulator:
         await self.simulator._update_drones()
         
         assert drone.status == DroneStatus.ERROR
-    
-    @pytest.mark.asyncio
+
+    async def test_batched_step_matches_physics(self):
+        """Test the torch-batched tick moves drones like the physics step"""
+        torch = pytest.importorskip("torch")
+        from backend.simulators.batched_simulator import TICK_COLUMNS, _tensor_step
+
+        await self.simulator.create_swarm(4, "test_run")
+        for drone_id, status in zip(self.simulator.drones, (DroneStatus.TAKING_OFF, DroneStatus.FLYING,
+                                                            DroneStatus.LANDING, DroneStatus.IDLE)):
+            drone = self.simulator.drones[drone_id]
+            drone.status = status
+            drone.z = 0.3
+            drone.target_x = 0.5
+            drone.takeoff_height = 0.6
+            drone.takeoff_duration = 2.0
+            drone.takeoff_start = 100.0
+
+        arrays = self.simulator._arrays
+        columns = [getattr(arrays, name)[:4].copy() for name in TICK_COLUMNS]
+        _tensor_step(*map(torch.as_tensor, columns), 101.0, 0.05, 1.0, 0.01)
+        self.simulator._step(arrays, np.arange(4), 101.0, 0.01)
+
+        for name, column in zip(TICK_COLUMNS, columns):
+            assert np.allclose(column, getattr(arrays, name)[:4]), name
+
+    async def test_batched_simulator_ticks_in_torch(self, tmp_path):
+        """Test the batched simulator runs a default-sized swarm through the torch step"""
+        pytest.importorskip("torch")
+        from backend.simulators import batched_simulator
+
+        simulator = batched_simulator.BatchedDroneSimulator(device="cpu",
+                                                            db_path=str(tmp_path / "batched.db"))
+        try:
+            await simulator.create_swarm(10, "test_run")
+            with patch.object(batched_simulator, "_tensor_step",
+                              wraps=batched_simulator._tensor_step) as tensor_step:
+                await simulator._update_drones()
+            assert tensor_step.called
+        finally:
+            simulator._conn.close()
+
+    def test_cython_step_matches_physics(self):
+        """Test the Cython tick moves drones like the Numba/NumPy physics step"""
+        from backend.simulators import physics
+        if physics._ticker is None:
+            pytest.skip("Cython physics step not built")
+
+        n = 64
+        rng = np.random.default_rng(0)
+        arrays = SwarmArrays(n)
+        arrays.add_many([f"d{i + 1}" for i in range(n)], "test_run")
+        arrays.pos[:] = rng.uniform(-2.5, 2.5, (n, 3))
+        arrays.pos[:, 2] = rng.uniform(0.0, 1.2, n)
+        arrays.vel[:] = rng.uniform(-1.0, 1.0, (n, 3))
+        arrays.target[:] = rng.uniform(-1.0, 1.0, (n, 3))
+        arrays.target[:8] = arrays.pos[:8] + 0.01  # already arrived
+        arrays.status[:] = rng.integers(0, 5, n)
+        arrays.battery[:] = rng.uniform(0.0, 100.0, n)
+        arrays.battery[:4] = 0.005  # drains to empty this tick
+        arrays.takeoff_height[:] = rng.uniform(0.3, 1.0, n)
+        arrays.takeoff_start[:] = rng.uniform(98.0, 101.0, n)
+        arrays.takeoff_duration[:] = rng.uniform(0.5, 3.0, n)
+
+        columns = ('pos', 'vel', 'target', 'status', 'battery',
+                   'takeoff_height', 'takeoff_start', 'takeoff_duration')
+        expected = [getattr(arrays, name).copy() for name in columns]
+        rows = np.arange(n)
+        physics._reference_step(*expected, rows, 101.0, 0.05, 1.0, 0.01)
+        physics._reference_flag_errors(expected[0], expected[4], expected[3], n, 2.0, 1.0)
+        physics._ticker.step(*(getattr(arrays, name) for name in columns),
+                             rows, 101.0, 0.05, 1.0, 0.01)
+        physics._ticker.flag_errors(arrays.pos, arrays.battery, arrays.status, n, 2.0, 1.0)
+
+        for name, column in zip(columns, expected):
+            assert np.allclose(getattr(arrays, name), column), name
+
     async def test_formation_calculation(self):
         """Test formation position calculations"""
         run_id = "test_run"
@@ -267,7 +513,6 @@ class TestDroneSimulator:
         # All positions should be at correct height
         assert all(pos[2] == 0.6 for pos in positions)
     
-    @pytest.mark.asyncio
     async def test_experiment_execution(self):
         """Test experiment scenario execution"""
         # Mock time.sleep to avoid actual delays
@@ -283,7 +528,6 @@ class TestDroneSimulator:
         assert result["success"] == True
         assert "runId" in result
     
-    @pytest.mark.asyncio
     async def test_reset_functionality(self):
         """Test simulation reset clears all state"""
         run_id = "test_run"
@@ -298,14 +542,44 @@ class TestDroneSimulator:
         # Verify drones cleared
         assert len(self.simulator.drones) == 0
 
+    async def test_state_frame(self):
+        """Test the binary state frame matches the per-drone states"""
+        drone_ids = await self.simulator.create_swarm(3, "test_run")
+        self.simulator.drones["d2"].x = 1.5
+        self.simulator.drones["d3"].status = DroneStatus.FLYING
+
+        frame = await self.simulator.get_state_frame()
+
+        header = struct.Struct('<IId')
+        tick, count, _ = header.unpack_from(frame)
+        assert count == len(drone_ids)
+        assert len(frame) == header.size + count * 7 * 4 + count
+
+        block = struct.unpack_from(f'<{count * 7}f', frame, header.size)
+        codes = frame[header.size + count * 7 * 4:]
+        assert block[7] == 1.5  # x of d2
+        assert block[6] == 100.0  # battery of d1
+        assert list(codes) == [0, 0, 2]
+
+        # Rows line up with the drones of get_all_states, also once a
+        # larger swarm has reused the rows of an earlier one
+        await self.simulator.reset()
+        await self.simulator.create_swarm(2, "test_run_2")
+        await self.simulator.create_swarm(4, "test_run_3")
+        for i, drone in enumerate(self.simulator.drones.values()):
+            drone.x = float(i)
+        frame = await self.simulator.get_state_frame()
+        _, count, _ = header.unpack_from(frame)
+        block = struct.unpack_from(f'<{count * 7}f', frame, header.size)
+        states = await self.simulator.get_all_states()
+        assert [block[i * 7] for i in range(count)] == [state["x"] for state in states.values()]
+
 class TestIntegration:
     """Integration tests for the complete system"""
     
-    @pytest.mark.asyncio
-    async def test_planner_integration(self):
+    async def test_planner_integration(self, simulator):
         """Test trajectory planner integration with simulator"""
         planner = SimpleCollisionAvoidance()
-        simulator = DroneSimulator()
         
         # Create test scenario
         start = [0.0, 0.0, 0.5]
@@ -321,10 +595,44 @@ class TestIntegration:
         assert validation["success"] == True
         assert len(path) >= 3  # Should have detour
     
-    @pytest.mark.asyncio
-    async def test_state_machine_integration(self):
+    async def test_validate_algorithm_in_pool(self, monkeypatch):
+        """Test /validate/algorithm plans its test cases in the planner worker pool"""
+        # main imports its packages relative to backend/, the way uvicorn runs it
+        monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1]))
+        import main
+
+        test_cases = [
+            {"start": [0.0, 0.0, 0.5], "goal": [2.0, 0.0, 0.5], "obstacles": []},
+            {"start": [0.0, 0.0, 0.5], "goal": [2.0, 0.0, 0.5], "obstacles": [[1.0, 0.0, 0.5]]},
+            {"start": [0.0, 0.0, 0.5], "goal": [3.0, 0.0, 0.5],
+             "obstacles": [[1.0, 0.0, 0.5], [2.0, 0.05, 0.5], [1.5, -0.1, 0.6]]},
+        ]
+        request = main.AlgorithmValidationRequest(algorithm="simple_collision_avoidance",
+                                                  testCases=test_cases)
+
+        # One worker is enough to go through the pool, and compiles the kernel once
+        monkeypatch.setattr(main, "PLANNER_WORKERS", 1)
+        pool = main.create_planner_pool()
+        monkeypatch.setattr(main.app.state, "pool", pool, raising=False)
+        try:
+            response = await main.validate_algorithm(request, token=main.BEARER_TOKEN)
+        finally:
+            pool.shutdown()
+
+        # Same results as planning in this process
+        planner = SimpleCollisionAvoidance()
+        assert len(response["results"]) == len(test_cases)
+        for test_case, result in zip(test_cases, response["results"]):
+            path = planner.plan_path(test_case["start"], test_case["goal"], test_case["obstacles"])
+            assert set(result) == {"testCase", "path", "planningTimeMs", "pathLengthM", "success"}
+            assert result["testCase"] == test_case
+            assert result["path"] == path
+            assert result["pathLengthM"] == planner.path_length(path)
+            assert result["success"] == True
+            assert result["planningTimeMs"] >= 0
+
+    async def test_state_machine_integration(self, simulator, fast_time):
         """Test complete state machine flow"""
-        simulator = DroneSimulator()
         
         # Create drone
         run_id = "integration_test"
@@ -340,8 +648,8 @@ class TestIntegration:
         
         # Simulate takeoff completion
         drone = simulator.drones[drone_id]
-        drone.takeoff_start = time.time() - 2.0  # Simulate 2 seconds ago
-        await simulator._update_takeoff(drone, time.time())
+        fast_time[0] += 2.0  # 2 seconds later
+        await simulator._update_drones()
         assert drone.status == DroneStatus.FLYING
         
         # Land
@@ -350,7 +658,7 @@ class TestIntegration:
         
         # Simulate landing completion
         drone.z = 0.0
-        await simulator._update_landing(drone, time.time())
+        await simulator._update_drones()
         assert drone.status == DroneStatus.IDLE
 
 if __name__ == "__main__":
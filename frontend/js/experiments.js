@@ -295,24 +295,38 @@ class ExperimentManager {
             totalPathLength += pathLength;
         });
 
-        // Calculate minimum separation between drones
+        // Calculate minimum separation between drones. Samples are delta
+        // logged, so a drone has no row on ticks where it barely moved;
+        // compare positions at each logged time, holding every drone at
+        // its latest sample up to that time.
         const droneIds = Object.keys(droneData);
-        for (let i = 0; i < droneIds.length; i++) {
-            for (let j = i + 1; j < droneIds.length; j++) {
-                const drone1 = droneData[droneIds[i]];
-                const drone2 = droneData[droneIds[j]];
-                
-                // Find minimum separation over time
-                const minLength = Math.min(drone1.length, drone2.length);
-                for (let k = 0; k < minLength; k++) {
-                    const dx = drone1[k].x - drone2[k].x;
-                    const dy = drone1[k].y - drone2[k].y;
-                    const dz = drone1[k].z - drone2[k].z;
+        const latest = {};
+        const cursor = {};
+        droneIds.forEach(id => { cursor[id] = 0; });
+        const times = [...new Set(samples.map(sample => sample.t))].sort((a, b) => a - b);
+        times.forEach(t => {
+            droneIds.forEach(id => {
+                const droneSamples = droneData[id];
+                while (cursor[id] < droneSamples.length && droneSamples[cursor[id]].t <= t) {
+                    latest[id] = droneSamples[cursor[id]];
+                    cursor[id]++;
+                }
+            });
+            for (let i = 0; i < droneIds.length; i++) {
+                for (let j = i + 1; j < droneIds.length; j++) {
+                    const a = latest[droneIds[i]];
+                    const b = latest[droneIds[j]];
+                    if (!a || !b) {
+                        continue;
+                    }
+                    const dx = a.x - b.x;
+                    const dy = a.y - b.y;
+                    const dz = a.z - b.z;
                     const distance = Math.sqrt(dx * dx + dy * dy + dz * dz);
                     minSeparation = Math.min(minSeparation, distance);
                 }
             }
-        }
+        });
 
         // Calculate flight time
         if (samples.length > 0) {
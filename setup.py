@@ -1,10 +1,35 @@
-from setuptools import setup, find_packages
+from setuptools import setup, find_packages, Extension
+
+# The Cython planner geometry helpers and physics step are optional; without
+# Cython the planner and simulator fall back to their Python implementations.
+# No -march=native (built modules must run on any x86-64) and no -ffast-math
+# (results must match the Python and Numba versions they are tested against).
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+
+ext_modules = []
+if cythonize is not None:
+    ext_modules = cythonize(
+        [Extension(
+            "backend.algorithms._geom",
+            ["backend/algorithms/_geom.pyx"],
+            extra_compile_args=["-O3"],
+        ), Extension(
+            "backend.simulators._ticker",
+            ["backend/simulators/_ticker.pyx"],
+            extra_compile_args=["-O3"],
+        )],
+        language_level=3,
+    )
 
 setup(
     name="crazyflie-swarm-demo",
     version="1.0.0",
     description="Crazyflie Swarm Demo Backend",
     packages=find_packages(),
+    ext_modules=ext_modules,
     install_requires=[
         "fastapi==0.104.1",
         "uvicorn[standard]==0.24.0",
@@ -14,6 +39,7 @@ setup(
         "python-jose[cryptography]==3.3.0",
         "passlib[bcrypt]==1.7.4",
         "python-dotenv==1.0.0",
+        "orjson==3.9.10",
         "pytest==7.4.3",
         "pytest-asyncio==0.21.1"
     ],